@@ -32,6 +32,9 @@ class Settings:
     OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5-mini")
     OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "1.0"))
     OPENAI_MAX_COMPLETION_TOKENS = int(os.getenv("OPENAI_MAX_COMPLETION_TOKENS", "2000"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # Concurrent LLM calls for content processing
+    LLM_RATE_LIMIT_RPM = int(os.getenv("LLM_RATE_LIMIT_RPM", "500"))  # Provider requests per minute
+    LLM_RATE_LIMIT_TPM = int(os.getenv("LLM_RATE_LIMIT_TPM", "200000"))  # Provider tokens per minute
 
     # Perplexity configuration
     PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
@@ -2,13 +2,455 @@
 """
 Content processing service for cleaning and extracting useful information from scraped content
 """
+import asyncio
+import hashlib
 import re
-from typing import Dict, List
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import orjson
+from ..config import settings
 from ..services.llm_service import get_llm_service
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rough characters-per-token ratio used to estimate prompt size
+CHARS_PER_TOKEN = 4
+
+# Non-ASCII inputs longer than this are cleaned as UTF-8 bytes (1 byte per ASCII char
+# instead of the 2-4 bytes per char of a wide str)
+BYTES_CLEANUP_THRESHOLD = 100_000
+
+# Completion token cap for batch persona extraction (6 categories per item)
+BATCH_MAX_COMPLETION_TOKENS = 15000
+
+
+class TokenBucket:
+    """
+    Proactive rate limiter for LLM requests
+    
+    Tracks both requests per minute and tokens per minute, refilling continuously.
+    acquire() waits until the request fits within both budgets, so calls are paced
+    before the provider starts returning 429s.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._available_requests = float(rpm)
+        self._available_tokens = float(tpm)
+        self._last_refill = time.monotonic()
+        # asyncio locks are bound to one event loop, so each loop gets its own while
+        # the budget above stays shared across loops
+        self._locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = \
+            weakref.WeakKeyDictionary()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._available_requests = min(self.rpm, self._available_requests + elapsed * self.rpm / 60)
+        self._available_tokens = min(self.tpm, self._available_tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int):
+        """
+        Wait until one request of the given estimated token size can be sent
+
+        Args:
+            tokens: Estimated input + output tokens for the request
+        """
+        # A single request larger than the whole budget only has to wait for a full bucket
+        tokens = min(tokens, self.tpm)
+
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        
+        async with lock:
+            while True:
+                self._refill()
+                if self._available_requests >= 1 and self._available_tokens >= tokens:
+                    self._available_requests -= 1
+                    self._available_tokens -= tokens
+                    return
+
+                wait_seconds = max(
+                    (1 - self._available_requests) * 60 / self.rpm,
+                    (tokens - self._available_tokens) * 60 / self.tpm
+                )
+                logger.debug(f"LLM rate limit reached, waiting {wait_seconds:.2f}s")
+                await asyncio.sleep(wait_seconds)
+
+
+# Shared across all ContentProcessor calls so concurrent batches respect provider limits
+_token_bucket = TokenBucket(rpm=settings.LLM_RATE_LIMIT_RPM, tpm=settings.LLM_RATE_LIMIT_TPM)
+
+# Concurrency limit per event loop; an asyncio.Semaphore cannot be shared across loops
+_llm_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    """Return the LLM concurrency semaphore for the running event loop"""
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _llm_semaphores[loop] = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    return semaphore
+
+
+# Cleanup rules as (pattern, spans_lines). Line-local rules are matched
+# without DOTALL so a match can never run past the end of its line.
+_CLEANUP_PATTERNS = (
+    # Remove image links and alt text
+    (r'!\[.*?\]\([^)]+\)', True),
+    # Remove duplicate line breaks
+    (r'\n{3,}', True),
+    # Remove URL parameters
+    (r'\([^)]*\?[^)]*\)', True),
+    # Remove technical error messages
+    (r'You have been blocked.*', False),
+    # Remove navigation elements
+    (r'\[Skip to main content\].*?\n', False),
+    # Remove loading and error messages
+    (r'Loading\.\.\..*', False),
+    (r'Load More Articles.*', False),
+    # Remove subscription and ad content
+    (r'Subscribe today for only.*', False),
+    (r'CTA:SUBSCRIBE.*', False),
+    # Remove duplicate link text
+    (r'\[View all\].*?\n', False),
+    # Remove empty links
+    (r'\[.*?\]\(\)', False),
+)
+
+_GLOBAL_CLEANUP_PATTERN = '|'.join(f'(?:{p})' for p, spans_lines in _CLEANUP_PATTERNS if spans_lines)
+_LINE_CLEANUP_PATTERN = '|'.join(f'(?:{p})' for p, spans_lines in _CLEANUP_PATTERNS if not spans_lines)
+_GLOBAL_CLEANUP_RE = re.compile(_GLOBAL_CLEANUP_PATTERN, re.DOTALL | re.IGNORECASE)
+_LINE_CLEANUP_RE = re.compile(_LINE_CLEANUP_PATTERN, re.IGNORECASE)
+# All cleanup patterns are ASCII, so they match identically on UTF-8 bytes
+_GLOBAL_CLEANUP_RE_BYTES = re.compile(_GLOBAL_CLEANUP_PATTERN.encode(), re.DOTALL | re.IGNORECASE)
+_LINE_CLEANUP_RE_BYTES = re.compile(_LINE_CLEANUP_PATTERN.encode(), re.IGNORECASE)
+
+# Whitespace run containing at least one line break (trailing spaces of a line,
+# blank lines and leading spaces of the next line)
+_LINE_BREAK_RE = re.compile(r'[^\S\n]*\n\s*')
+
+# Number of clean_markdown results kept, keyed by content hash
+CLEAN_CACHE_SIZE = 256
+
+# A line is shared navigation/footer boilerplate when it appears in more than
+# max(BOILERPLATE_MIN_ITEMS, n // 2) of a batch's n content items
+BOILERPLATE_MIN_ITEMS = 2
+
+# Batches with at least this many items are cleaned in worker threads
+THREADED_CLEANUP_MIN_ITEMS = 4
+
+# Section header used to split batch LLM output by content item, in either the form the
+# extraction template uses ("**CONTENT ITEM N** (type)", body on the following lines) or
+# "**Content Item N (type) - title**:" with the body after the colon
+_SECTION_HEADER_RE = re.compile(r'\*\*Content Item (\d+)(?:\*\*[^\n]*|[^\n*]*\*\*:)', re.IGNORECASE)
+
+# Important patterns to keep (sales-related)
+_IMPORTANT_PATTERNS = (
+    # Executives and decision makers
+    r'.*CEO.*',
+    r'.*CTO.*',
+    r'.*CFO.*',
+    r'.*VP.*',
+    r'.*Director.*',
+    r'.*Manager.*',
+    r'.*Head of.*',
+    r'.*Chief.*',
+    # Business partnerships and development
+    r'.*partnership.*',
+    r'.*collaboration.*',
+    r'.*acquisition.*',
+    r'.*merger.*',
+    r'.*investment.*',
+    r'.*funding.*',
+    # Financial and scale
+    r'.*revenue.*',
+    r'.*valuation.*',
+    r'.*million.*',
+    r'.*billion.*',
+    r'.*employees.*',
+    r'.*customers.*',
+    r'.*users.*',
+    r'.*market.*',
+    # Pain points and challenges
+    r'.*challenge.*',
+    r'.*problem.*',
+    r'.*issue.*',
+    r'.*difficulty.*',
+    r'.*struggle.*',
+    r'.*pain point.*',
+    # Needs and opportunities
+    r'.*need.*',
+    r'.*requirement.*',
+    r'.*opportunity.*',
+    r'.*growth.*',
+    r'.*expansion.*',
+    r'.*scaling.*',
+    # Technology and digitalization
+    r'.*digital.*',
+    r'.*technology.*',
+    r'.*innovation.*',
+    r'.*transformation.*',
+    r'.*upgrade.*',
+    r'.*modernization.*',
+    # Policies and compliance
+    r'.*policy.*',
+    r'.*regulation.*',
+    r'.*compliance.*',
+    r'.*standard.*',
+    r'.*requirement.*',
+    # Competition and market
+    r'.*competitor.*',
+    r'.*competition.*',
+    r'.*market share.*',
+    r'.*position.*',
+    r'.*advantage.*',
+    # Budget and procurement
+    r'.*budget.*',
+    r'.*procurement.*',
+    r'.*purchase.*',
+    r'.*vendor.*',
+    r'.*supplier.*',
+    # Success cases
+    r'.*success.*',
+    r'.*case study.*',
+    r'.*achievement.*',
+    r'.*milestone.*',
+    # Industry trends
+    r'.*trend.*',
+    r'.*future.*',
+    r'.*emerging.*',
+    r'.*disruption.*',
+)
+
+
+
+def _strip_wildcards(pattern: str) -> str:
+    """Drop the leading/trailing '.*' of a keyword pattern, leaving the bare keyword"""
+    if pattern.startswith('.*') and pattern.endswith('.*') and len(pattern) > 4:
+        return pattern[2:-2]
+    return pattern
+
+
+# Every important pattern is a plain keyword, so matching is a lowercase substring test
+_IMPORTANT_KEYWORDS = tuple(dict.fromkeys(_strip_wildcards(p).lower() for p in _IMPORTANT_PATTERNS))
+_MIN_KEYWORD_LENGTH = min(len(keyword) for keyword in _IMPORTANT_KEYWORDS)
+
+
+# Prompt blocks for batch persona extraction. The category template is sent once per
+# call; each content item only adds a one-line entry to the item list
+_BATCH_SYSTEM_MESSAGE = """You are a B2B customer persona analyst specializing in extracting ONLY factual information from source documents.
+
+CRITICAL ANTI-HALLUCINATION RULES (YOU MUST FOLLOW THESE):
+1. Extract ONLY information explicitly stated in the source text
+2. For each fact, include a direct quote or paraphrase from the source
+3. If information is not present in the text, you MUST write "Not mentioned"
+4. NEVER infer, assume, or generate information not in the source
+5. NEVER make up customer names, statistics, or quotes
+6. If you're uncertain about any information, mark it as "Uncertain: [your note]"
+7. Distinguish between what customers say vs. what the company claims
+
+PRIMARY GOAL: Extract factual intelligence to build accurate B2B customer personas.
+
+EXTRACTION FRAMEWORK (6 Categories):
+
+1. CURRENT CUSTOMERS & TARGET MARKET
+   - Specific customer company names explicitly mentioned
+   - Industries and verticals served
+   - Company sizes (Enterprise/Mid-market/SMB)
+   - Geographic markets served
+   - Customer statistics and metrics
+   - Job roles of people at customer companies
+
+2. PRODUCTS & SERVICES
+   - Main products/services and their descriptions
+   - Key features and capabilities
+   - Product positioning and value proposition
+   - Use cases and applications
+   - How the product/service works
+
+3. CUSTOMER SUCCESS STORIES & USE CASES
+   - Customer testimonials and case studies
+   - Specific use cases and outcomes
+   - Problems solved for customers
+   - Results and metrics achieved
+   - Who at the customer company uses the product (roles/departments)
+
+4. CUSTOMER PAIN POINTS & NEEDS
+   - Problems customers face (as mentioned in content)
+   - Customer needs and requirements
+   - Challenges the product addresses
+   - Customer goals and objectives
+
+5. COMPANY PROFILE & MARKET POSITION
+   - Company size, revenue, employee count
+   - Market position and competitive advantages
+   - Key partnerships and integrations
+   - Industry recognition and awards
+   - Company history and milestones
+
+6. DECISION MAKERS & KEY PERSONNEL
+   - Executive team (names, titles)
+   - Key spokespeople and their backgrounds
+   - Leadership changes or announcements
+   - Relevant for understanding company direction
+
+VERIFICATION CHECKLIST before you output:
+✓ Every fact has a source quote or paraphrase
+✓ No information is inferred or assumed
+✓ Missing information is marked "Not mentioned"
+✓ Uncertain information is flagged
+✓ Customer quotes are in quotation marks"""
+
+_INSTRUCTIONS_HEADER = """INSTRUCTIONS:
+Extract the 6 categories below for each content item separately. Be precise, factual, and include source quotes.
+"""
+
+_CATEGORY_TEMPLATE = """
+1. **CURRENT CUSTOMERS & TARGET MARKET**
+   Extract ONLY if explicitly mentioned:
+   • Customer company names: [list with source quotes]
+   • Industries and company sizes: [with source quotes]
+   • Geographic markets: [regions with source quotes]
+   • Job roles at customer companies: [titles with source quotes]
+   • Customer statistics: [e.g., "85% of Fortune 100" with source quote]
+   
+   If no information found, write: "Not mentioned"
+
+2. **PRODUCTS & SERVICES**
+   Extract ONLY if explicitly mentioned:
+   • Main products/services: [descriptions with source quotes]
+   • Key features and capabilities: [with source quotes]
+   • Product positioning and value proposition: [with source quotes]
+   • Use cases and applications: [with source quotes]
+   
+   If no information found, write: "Not mentioned"
+
+3. **CUSTOMER SUCCESS STORIES & USE CASES**
+   Extract ONLY if explicitly mentioned:
+   • Customer testimonials and case studies: [with exact quotes and attribution]
+   • Specific use cases and outcomes: [with source quotes]
+   • Problems solved for customers: [with source quotes]
+   • Results and metrics achieved: [specific numbers with source quotes]
+   • User roles at customer companies: [titles/departments with source quotes]
+   
+   If no information found, write: "Not mentioned"
+
+4. **CUSTOMER PAIN POINTS & NEEDS**
+   Extract ONLY if explicitly mentioned:
+   • Problems customers face: [as mentioned in content with quotes]
+   • Customer needs and requirements: [with source quotes]
+   • Challenges the product addresses: [with source quotes]
+   • Customer goals and objectives: [with source quotes]
+   
+   If no information found, write: "Not mentioned"
+
+5. **COMPANY PROFILE & MARKET POSITION**
+   Extract ONLY if explicitly mentioned:
+   • Company size, revenue, employee count: [with source quotes]
+   • Market position and competitive advantages: [with source quotes]
+   • Key partnerships and integrations: [with source quotes]
+   • Industry recognition and awards: [with source quotes]
+   
+   If no information found, write: "Not mentioned"
+
+6. **DECISION MAKERS & KEY PERSONNEL**
+   Extract ONLY if explicitly mentioned:
+   • Executive team names and titles: [with source quotes]
+   • Key spokespeople and their backgrounds: [with source quotes]
+   • Leadership changes or announcements: [with source quotes]
+   
+   If no information found, write: "Not mentioned"
+"""
+
+_ITEM_LIST_HEADER = """
+═══════════════════════════════════════════════════════════
+CONTENT ITEMS (answer every category above for each one):
+═══════════════════════════════════════════════════════════
+"""
+
+_ITEM_TEMPLATE = "**CONTENT ITEM {idx}** ({ctype}) - URL: {url}\n"
+
+_FINAL_REMINDERS = """
+
+═══════════════════════════════════════════════════════════
+FINAL REMINDERS BEFORE YOU RESPOND:
+═══════════════════════════════════════════════════════════
+✓ Extract information SEPARATELY for each content item in the order shown above
+✓ Include direct quotes (in "quotation marks") for every fact
+✓ Write "Not mentioned" for any category with no information in that content item
+✓ Do NOT infer or generate information not explicitly in the source
+✓ Do NOT mix information between different content items
+✓ Do NOT make up company names, statistics, or quotes
+✓ If uncertain about anything, mark it: "Uncertain: [explain why]"
+
+OUTPUT FORMAT:
+Return ONLY raw JSON. No markdown, no ```json blocks, no explanations.
+{
+  "items": [
+    {
+      "item": 1,
+      "url": "<content item URL>",
+      "categories": {
+        "customers_and_market": "...",
+        "products_and_services": "...",
+        "success_stories": "...",
+        "pain_points": "...",
+        "company_profile": "...",
+        "decision_makers": "..."
+      }
+    }
+  ]
+}
+Include one entry in "items" for every content item, using the item numbers shown above.
+Each category value is the extracted text with its source quotes, or "Not mentioned".
+
+Now extract the persona information:
+"""
+
+# JSON category keys requested in the output format, with the headings used when
+# rendering each item's analysis back to markdown
+_CATEGORY_TITLES = (
+    ('customers_and_market', 'CURRENT CUSTOMERS & TARGET MARKET'),
+    ('products_and_services', 'PRODUCTS & SERVICES'),
+    ('success_stories', 'CUSTOMER SUCCESS STORIES & USE CASES'),
+    ('pain_points', 'CUSTOMER PAIN POINTS & NEEDS'),
+    ('company_profile', 'COMPANY PROFILE & MARKET POSITION'),
+    ('decision_makers', 'DECISION MAKERS & KEY PERSONNEL'),
+)
+
+
+def _format_content_item(number: int, cleaned_content: str, mapping: Dict) -> str:
+    """Label a cleaned content item for the prompt; multi-company batches also name the company"""
+    company_line = f"Company: {mapping['company']}\n" if 'company' in mapping else ""
+    return (
+        f"--- Content {number} ({mapping['type']}) ---\n"
+        f"{company_line}URL: {mapping['url']}\n{cleaned_content}"
+    )
+
+
+def _render_categories(categories: Dict) -> str:
+    """Render one item's JSON categories as markdown sections in framework order"""
+    blocks = []
+    for number, (key, title) in enumerate(_CATEGORY_TITLES, start=1):
+        value = categories.get(key) or "Not mentioned"
+        if isinstance(value, list):
+            value = '\n'.join(f"• {entry}" for entry in value)
+        elif not isinstance(value, str):
+            value = orjson.dumps(value).decode()
+        blocks.append(f"{number}. **{title}**\n{value}")
+    return '\n\n'.join(blocks)
+
 
 class ContentProcessor:
     """
@@ -37,110 +479,45 @@ class ContentProcessor:
     Recommended to use batch_process_content() method for batch processing, more efficient.
     """
 
-    def __init__(self):
-        self.llm_service = get_llm_service()
-
-        # Define cleanup rules
-        self.cleanup_patterns = [
-            # Remove image links and alt text
-            r'!\[.*?\]\([^)]+\)',
-            # Remove duplicate line breaks
-            r'\n{3,}',
-            # Remove URL parameters
-            r'\([^)]*\?[^)]*\)',
-            # Remove technical error messages
-            r'You have been blocked.*',
-            # Remove navigation elements
-            r'\[Skip to main content\].*?\n',
-            # Remove loading and error messages
-            r'Loading\.\.\..*',
-            r'Load More Articles.*',
-            # Remove subscription and ad content
-            r'Subscribe today for only.*',
-            r'CTA:SUBSCRIBE.*',
-            # Remove duplicate link text
-            r'\[View all\].*?\n',
-            # Remove empty links
-            r'\[.*?\]\(\)',
-        ]
+    __slots__ = (
+        'target_prompt_tokens',
+        'max_items_per_call',
+        'cleanup_patterns',
+        'important_patterns',
+        '_clean_cache',
+        '_clean_cache_lock',
+        '_llm_service',
+    )
 
-        # Define important patterns to keep (sales-related)
-        self.important_patterns = [
-            # Executives and decision makers
-            r'.*CEO.*',
-            r'.*CTO.*',
-            r'.*CFO.*',
-            r'.*VP.*',
-            r'.*Director.*',
-            r'.*Manager.*',
-            r'.*Head of.*',
-            r'.*Chief.*',
-            # Business partnerships and development
-            r'.*partnership.*',
-            r'.*collaboration.*',
-            r'.*acquisition.*',
-            r'.*merger.*',
-            r'.*investment.*',
-            r'.*funding.*',
-            # Financial and scale
-            r'.*revenue.*',
-            r'.*valuation.*',
-            r'.*million.*',
-            r'.*billion.*',
-            r'.*employees.*',
-            r'.*customers.*',
-            r'.*users.*',
-            r'.*market.*',
-            # Pain points and challenges
-            r'.*challenge.*',
-            r'.*problem.*',
-            r'.*issue.*',
-            r'.*difficulty.*',
-            r'.*struggle.*',
-            r'.*pain point.*',
-            # Needs and opportunities
-            r'.*need.*',
-            r'.*requirement.*',
-            r'.*opportunity.*',
-            r'.*growth.*',
-            r'.*expansion.*',
-            r'.*scaling.*',
-            # Technology and digitalization
-            r'.*digital.*',
-            r'.*technology.*',
-            r'.*innovation.*',
-            r'.*transformation.*',
-            r'.*upgrade.*',
-            r'.*modernization.*',
-            # Policies and compliance
-            r'.*policy.*',
-            r'.*regulation.*',
-            r'.*compliance.*',
-            r'.*standard.*',
-            r'.*requirement.*',
-            # Competition and market
-            r'.*competitor.*',
-            r'.*competition.*',
-            r'.*market share.*',
-            r'.*position.*',
-            r'.*advantage.*',
-            # Budget and procurement
-            r'.*budget.*',
-            r'.*procurement.*',
-            r'.*purchase.*',
-            r'.*vendor.*',
-            r'.*supplier.*',
-            # Success cases
-            r'.*success.*',
-            r'.*case study.*',
-            r'.*achievement.*',
-            r'.*milestone.*',
-            # Industry trends
-            r'.*trend.*',
-            r'.*future.*',
-            r'.*emerging.*',
-            r'.*disruption.*',
-        ]
+    def __init__(self):
+        # Target source-content size per LLM call; larger batches are split into
+        # sub-batches that are processed concurrently
+        self.target_prompt_tokens = 5000
+        # Each item gets its own 6-category analysis, so the item count also bounds
+        # how much of the completion budget a single call needs
+        self.max_items_per_call = 8
+
+        # Patterns are compiled once at module import and shared by all instances
+        self.cleanup_patterns = _CLEANUP_PATTERNS
+        self.important_patterns = _IMPORTANT_PATTERNS
+
+        # LRU cache of cleaned content; the lock makes it safe for threaded cleaning
+        self._clean_cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._clean_cache_lock = threading.Lock()
+
+        self._llm_service = None
+
+    @property
+    def llm_service(self):
+        """LLM service, created on first use so rule-based callers never build a client"""
+        if self._llm_service is None:
+            self._llm_service = get_llm_service()
+        return self._llm_service
+
+    @staticmethod
+    def _hash(content: str) -> bytes:
+        """Return a 16-byte blake2b digest of content"""
+        return hashlib.blake2b(content.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
 
     def clean_markdown(self, markdown: str) -> str:
         """
@@ -155,23 +532,54 @@ class ContentProcessor:
         if not markdown:
             return ""
 
-        logger.debug(f"Cleaning markdown content, original length: {len(markdown)}")
+        # Repeated content (retries, the LLM-failure fallback, re-scraped pages) is cleaned once
+        key = self._hash(markdown)
+        with self._clean_cache_lock:
+            cleaned = self._clean_cache.get(key)
+            if cleaned is not None:
+                self._clean_cache.move_to_end(key)
+                return cleaned
 
-        # Apply cleanup rules
-        cleaned = markdown
-        for pattern in self.cleanup_patterns:
-            cleaned = re.sub(pattern, '', cleaned, flags=re.DOTALL | re.IGNORECASE)
+        cleaned = self._clean_markdown_uncached(markdown)
 
-        # Remove extra blank lines
-        cleaned = re.sub(r'\n\s*\n', '\n\n', cleaned)
+        with self._clean_cache_lock:
+            self._clean_cache[key] = cleaned
+            if len(self._clean_cache) > CLEAN_CACHE_SIZE:
+                self._clean_cache.popitem(last=False)
+        return cleaned
 
-        # Remove leading and trailing whitespace
-        lines = [line.strip() for line in cleaned.split('\n')]
-        cleaned = '\n'.join(line for line in lines if line)
+    def _clean_markdown_uncached(self, markdown: str) -> str:
+        """Apply the cleanup rules and line normalization to non-empty markdown"""
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Cleaning markdown content, original length: %d", len(markdown))
 
-        logger.debug(f"Cleaned markdown length: {len(cleaned)}")
+        # Apply cleanup rules
+        if len(markdown) > BYTES_CLEANUP_THRESHOLD and not markdown.isascii():
+            cleaned = self._apply_cleanup_bytes(markdown)
+        else:
+            cleaned = _GLOBAL_CLEANUP_RE.sub('', markdown)
+            cleaned = _LINE_CLEANUP_RE.sub('', cleaned)
+
+        # Strip whitespace around line breaks and drop blank lines in a single pass
+        cleaned = _LINE_BREAK_RE.sub('\n', cleaned)
+
+        if debug:
+            logger.debug("Cleaned markdown length: %d", len(cleaned))
         return cleaned.strip()
 
+    def _apply_cleanup_bytes(self, markdown: str) -> str:
+        """
+        Apply cleanup rules on the UTF-8 encoding of large non-ASCII content
+
+        Every removed span starts at an ASCII character and ends at an ASCII
+        character or the end of the text, so decoding the result is always valid.
+        """
+        buf = markdown.encode('utf-8', 'surrogatepass')
+        buf = _GLOBAL_CLEANUP_RE_BYTES.sub(b'', buf)
+        buf = _LINE_CLEANUP_RE_BYTES.sub(b'', buf)
+        return buf.decode('utf-8', 'surrogatepass')
+
     def extract_important_content(self, content: str) -> str:
         """
         Extract important content
@@ -186,18 +594,20 @@ class ContentProcessor:
             return ""
 
         important_lines = []
+        # Lowercase the whole document once; lowering never adds or removes line breaks,
+        # so the lowered lines stay aligned with the original ones
         lines = content.split('\n')
+        lowered_lines = content.lower().split('\n')
 
-        for line in lines:
+        for line, lowered in zip(lines, lowered_lines):
             line = line.strip()
-            if not line:
+            # Lines shorter than every keyword (including blank lines) cannot match
+            if len(line) < _MIN_KEYWORD_LENGTH:
                 continue
 
-            # Check if contains important patterns
-            for pattern in self.important_patterns:
-                if re.search(pattern, line, re.IGNORECASE):
-                    important_lines.append(line)
-                    break
+            # Check if contains important keywords
+            if any(keyword in lowered for keyword in _IMPORTANT_KEYWORDS):
+                important_lines.append(line)
 
         return '\n'.join(important_lines)
 
@@ -215,25 +625,22 @@ class ContentProcessor:
         if len(content) <= max_chars:
             return content
 
-        logger.debug(f"Truncating content from {len(content)} to {max_chars} chars")
-
-        # Truncate by paragraphs, maintaining integrity
-        paragraphs = content.split('\n\n')
-        result = []
-        char_count = 0
-
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-
-            if char_count + len(para) + 2 > max_chars:  # +2 for \n\n
-                break
-            result.append(para)
-            char_count += len(para) + 2
-
-        truncated = '\n\n'.join(result)
-        logger.debug(f"Truncated content length: {len(truncated)}")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Truncating content from %d to %d chars", len(content), max_chars)
+
+        # Cut at the last paragraph break that fits, without splitting the whole content.
+        # If that would drop more than half the budget, cut at the last line break instead,
+        # and as a last resort cut mid-line.
+        cut = content.rfind('\n\n', 0, max_chars)
+        if cut < max_chars // 2:
+            cut = content.rfind('\n', 0, max_chars)
+        if cut < max_chars // 2:
+            cut = max_chars
+
+        truncated = content[:cut].rstrip()
+        if debug:
+            logger.debug("Truncated content length: %d", len(truncated))
         return truncated
 
 
@@ -268,42 +675,27 @@ class ContentProcessor:
         if not content_batch:
             return []
         
-        logger.info(f"Batch processing {len(content_batch)} content items "
-                    f"for {company_name}")
-        
-        # Combine all content into one large prompt
-        combined_content = []
-        content_mapping = {}  # Used to track each content item
-        
-        for i, batch_item in enumerate(content_batch):
-            content = batch_item['content']
-            content_type = batch_item['type']
-            url = batch_item['item']['url']
-            
-            # First perform rule-based cleaning
-            cleaned_content = self.clean_markdown(content)
-            if cleaned_content:
-                combined_content.append(
-                    f"--- Content {i+1} ({content_type}) ---\n"
-                    f"URL: {url}\n{cleaned_content}"
-                )
-                content_mapping[i] = {
-                    'url': url,
-                    'type': content_type,
-                    'original_length': len(content),
-                    'cleaned_length': len(cleaned_content)
-                }
-        
-        if not combined_content:
+        sub_batches = await self._prepare_sub_batches(content_batch, company_name)
+        if not sub_batches:
             return []
         
-        # Combine all content
-        full_content = "\n\n".join(combined_content)
-        
-        # Use LLM for batch processing
+        # Use LLM for batch processing, one call per sub-batch
         try:
-            processed_result = await self._batch_extract_with_llm(full_content, company_name, content_mapping)
-            return processed_result
+            sub_results = await asyncio.gather(*(
+                self._batch_extract_with_llm(sub_content, company_name, sub_mapping)
+                for sub_content, sub_mapping in sub_batches
+            ), return_exceptions=True)
+            
+            # A failed sub-batch falls back to rule-based cleaning for its own items only
+            content_by_url = {}
+            for batch_item in content_batch:
+                content_by_url.setdefault(batch_item['item']['url'], batch_item['content'])
+            for index, sub_result in enumerate(sub_results):
+                if isinstance(sub_result, Exception):
+                    logger.error(f"Batch LLM processing failed for sub-batch {index + 1}/{len(sub_batches)}: "
+                                 f"{str(sub_result)}")
+                    sub_results[index] = self._fallback_sub_batch_results(sub_batches[index][1], content_by_url)
+            return self._merge_sub_batch_results(sub_results)
             
         except Exception as e:
             logger.error(f"Batch LLM processing failed: {str(e)}")
@@ -317,12 +709,310 @@ class ContentProcessor:
                 for batch_item in content_batch
             ]
     
-    async def _batch_extract_with_llm(self, combined_content: str, 
+    async def iter_batch_process_content(self, content_batch: List[Dict],
+                                         company_name: str) -> AsyncIterator[Dict]:
+        """
+        Streaming variant of batch_process_content
+        
+        Yields processed items as soon as their sub-batch finishes, so downstream stages
+        can start before the slowest LLM call returns. Items arrive in completion order,
+        each carrying the token usage of its own sub-batch. Unlike batch_process_content,
+        LLM errors are raised rather than replaced by rule-based cleaning.
+        
+        Args:
+            content_batch: Content batch list, each element contains 
+                          {'item': item, 'content': str, 'type': str}
+            company_name: Company name
+            
+        Yields:
+            Processed content items
+        """
+        if not content_batch:
+            return
+        
+        sub_batches = await self._prepare_sub_batches(content_batch, company_name)
+        async for _, sub_result in self._extract_sub_batches(sub_batches, company_name):
+            for result in sub_result:
+                yield result
+    
+    async def multi_company_batch_process(self, batches: List[Tuple[str, List[Dict]]]) -> List[List[Dict]]:
+        """
+        Process content for several companies, sharing one LLM call when it fits
+        
+        When every company's cleaned content fits together within a single call's prompt
+        budget and item limit, all items are numbered across companies and extracted in one request, so
+        the system prompt and instructions are sent once. Otherwise each company is
+        processed with batch_process_content concurrently.
+        
+        Args:
+            batches: List of (company_name, content_batch) tuples, where content_batch
+                     has the same format as for batch_process_content
+            
+        Returns:
+            One processed content list per company, in input order
+        """
+        if not batches:
+            return []
+        
+        cleaned_per_company = await asyncio.gather(*(
+            self._clean_batch_items(content_batch, company_name)
+            for company_name, content_batch in batches
+        ))
+        
+        total_chars = sum(
+            len(cleaned_content)
+            for cleaned_items in cleaned_per_company
+            for cleaned_content, _ in cleaned_items
+        )
+        total_items = sum(len(cleaned_items) for cleaned_items in cleaned_per_company)
+        if (len(batches) == 1 or total_chars > self.target_prompt_tokens * CHARS_PER_TOKEN
+                or total_items > self.max_items_per_call):
+            return list(await asyncio.gather(*(
+                self.batch_process_content(content_batch, company_name)
+                for company_name, content_batch in batches
+            )))
+        
+        content_items = []
+        content_mapping = []
+        result_counts = []
+        for (company_name, _), cleaned_items in zip(batches, cleaned_per_company):
+            for cleaned_content, mapping in cleaned_items:
+                mapping['company'] = company_name
+                content_items.append(_format_content_item(len(content_items) + 1, cleaned_content, mapping))
+                content_mapping.append(mapping)
+            # Each item yields one result plus one per alias
+            result_counts.append(sum(1 + len(mapping['aliases']) for _, mapping in cleaned_items))
+        
+        company_names = [company_name for company_name, _ in batches]
+        logger.info(f"Combining {len(content_items)} content items for {len(batches)} companies into one LLM call")
+        
+        try:
+            results = []
+            if content_items:
+                results = await self._batch_extract_with_llm(content_items, ", ".join(company_names), content_mapping)
+            
+        except Exception as e:
+            logger.error(f"Multi-company LLM processing failed: {str(e)}")
+            # Fallback to rule-based cleaning
+            return [
+                [
+                    {
+                        'url': batch_item['item']['url'],
+                        'processed_content': self.clean_markdown(batch_item['content']),
+                        'type': batch_item['type']
+                    }
+                    for batch_item in content_batch
+                ]
+                for _, content_batch in batches
+            ]
+        
+        per_company = []
+        start = 0
+        for count in result_counts:
+            per_company.append(results[start:start + count])
+            start += count
+        return per_company
+    
+    async def _prepare_sub_batches(self, content_batch: List[Dict],
+                                   company_name: str) -> List[Tuple[List[str], List[Dict]]]:
+        """Clean each content item and pack the non-empty ones into LLM sub-batches"""
+        cleaned_items = await self._clean_batch_items(content_batch, company_name)
+        if not cleaned_items:
+            return []
+        
+        sub_batches = self._build_sub_batches(cleaned_items)
+        if len(sub_batches) > 1:
+            logger.info(f"Split {len(cleaned_items)} content items into {len(sub_batches)} sub-batches")
+        return sub_batches
+    
+    async def _clean_batch_items(self, content_batch: List[Dict], company_name: str) -> List[Tuple[str, Dict]]:
+        """Clean each content item and return (cleaned_content, mapping) for the unique non-empty ones"""
+        logger.info(f"Batch processing {len(content_batch)} content items "
+                    f"for {company_name}")
+        
+        # First perform rule-based cleaning, off the event loop for larger batches
+        if len(content_batch) >= THREADED_CLEANUP_MIN_ITEMS:
+            cleaned_contents = await asyncio.gather(*(
+                asyncio.to_thread(self.clean_markdown, batch_item['content'])
+                for batch_item in content_batch
+            ))
+        else:
+            cleaned_contents = [self.clean_markdown(batch_item['content']) for batch_item in content_batch]
+        
+        # Clean each content item and keep track of it for output mapping
+        cleaned_items = []
+        # Identical cleaned content (pagination, mirror URLs) is sent to the LLM once;
+        # the other URLs are recorded as aliases of the first occurrence
+        unique_items = {}
+        duplicate_count = 0
+        
+        for batch_item, cleaned_content in zip(content_batch, cleaned_contents):
+            content = batch_item['content']
+            content_type = batch_item['type']
+            url = batch_item['item']['url']
+            
+            if not cleaned_content:
+                continue
+            
+            content_hash = self._hash(cleaned_content)
+            if content_hash in unique_items:
+                unique_items[content_hash]['aliases'].append({'url': url, 'type': content_type})
+                duplicate_count += 1
+                continue
+            
+            mapping = {
+                'url': url,
+                'type': content_type,
+                'original_length': len(content),
+                'cleaned_length': len(cleaned_content),
+                'aliases': []
+            }
+            unique_items[content_hash] = mapping
+            cleaned_items.append((cleaned_content, mapping))
+        
+        if duplicate_count:
+            logger.info(f"Skipping {duplicate_count} duplicate content items")
+        
+        return self._strip_shared_boilerplate(cleaned_items)
+    
+    @staticmethod
+    def _strip_shared_boilerplate(cleaned_items: List[Tuple[str, Dict]]) -> List[Tuple[str, Dict]]:
+        """
+        Drop lines repeated across many items of a batch (shared nav, footers, banners)
+        
+        clean_markdown leaves one paragraph or heading per line, so lines are the unit.
+        A line is dropped when it appears in more than max(BOILERPLATE_MIN_ITEMS, n // 2)
+        of the n items. Items made up entirely of boilerplate keep their content.
+        """
+        max_items = max(BOILERPLATE_MIN_ITEMS, len(cleaned_items) // 2)
+        if len(cleaned_items) <= max_items:
+            return cleaned_items
+        
+        item_lines = [cleaned_content.split('\n') for cleaned_content, _ in cleaned_items]
+        line_counts = Counter(line for lines in item_lines for line in set(lines))
+        boilerplate = {line for line, count in line_counts.items() if count > max_items}
+        if not boilerplate:
+            return cleaned_items
+        
+        stripped_items = []
+        removed_chars = 0
+        for (cleaned_content, mapping), lines in zip(cleaned_items, item_lines):
+            kept = '\n'.join(line for line in lines if line not in boilerplate)
+            if kept:
+                removed_chars += len(cleaned_content) - len(kept)
+                mapping['cleaned_length'] = len(kept)
+                cleaned_content = kept
+            stripped_items.append((cleaned_content, mapping))
+        
+        logger.info(f"Removed {len(boilerplate)} boilerplate lines shared across content items "
+                    f"({removed_chars} chars)")
+        return stripped_items
+    
+    async def _extract_sub_batches(self, sub_batches: List[Tuple[List[str], List[Dict]]],
+                                   company_name: str) -> AsyncIterator[Tuple[int, List[Dict]]]:
+        """
+        Run one LLM extraction per sub-batch and yield (index, results) as each completes
+        
+        Concurrency and rate limits are enforced around each LLM call. If any sub-batch
+        fails, the remaining calls are cancelled and the error is raised.
+        """
+        async def extract(index: int, sub_content: List[str], sub_mapping: List[Dict]) -> Tuple[int, List[Dict]]:
+            return index, await self._batch_extract_with_llm(sub_content, company_name, sub_mapping)
+        
+        tasks = [
+            asyncio.ensure_future(extract(index, sub_content, sub_mapping))
+            for index, (sub_content, sub_mapping) in enumerate(sub_batches)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def _build_sub_batches(self, cleaned_items: List[Tuple[str, Dict]]) -> List[Tuple[List[str], List[Dict]]]:
+        """
+        Greedily pack cleaned content items into sub-batches under the prompt token budget
+        and the per-call item limit
+        
+        Args:
+            cleaned_items: List of (cleaned_content, mapping) tuples in input order
+            
+        Returns:
+            List of (content_items, content_mapping) tuples, one per LLM call, where
+            content_items holds one labelled text per item and content_mapping the
+            matching mappings. Items are renumbered from 1 within each sub-batch.
+        """
+        max_chars = self.target_prompt_tokens * CHARS_PER_TOKEN
+        groups = []
+        current = []
+        current_chars = 0
+        
+        for cleaned_content, mapping in cleaned_items:
+            if current and (current_chars + len(cleaned_content) > max_chars
+                            or len(current) >= self.max_items_per_call):
+                groups.append(current)
+                current = []
+                current_chars = 0
+            current.append((cleaned_content, mapping))
+            current_chars += len(cleaned_content)
+        
+        if current:
+            groups.append(current)
+        
+        sub_batches = []
+        for group in groups:
+            content_items = [
+                _format_content_item(i + 1, cleaned_content, mapping)
+                for i, (cleaned_content, mapping) in enumerate(group)
+            ]
+            content_mapping = [mapping for _, mapping in group]
+            sub_batches.append((content_items, content_mapping))
+        
+        return sub_batches
+    
+    def _fallback_sub_batch_results(self, content_mapping: List[Dict],
+                                    content_by_url: Dict[str, str]) -> List[Dict]:
+        """Rule-based results for a sub-batch whose LLM call failed, aliases included"""
+        results = []
+        for mapping in content_mapping:
+            for entry in [mapping] + mapping['aliases']:
+                results.append({
+                    'url': entry['url'],
+                    'processed_content': self.clean_markdown(content_by_url[entry['url']]),
+                    'type': entry['type']
+                })
+        return results
+    
+    @staticmethod
+    def _merge_sub_batch_results(sub_results: List[List[Dict]]) -> List[Dict]:
+        """
+        Flatten sub-batch results in input order and total their token usage
+        
+        Every result carries the combined token usage, so callers can read it from any item.
+        """
+        results = [result for sub_result in sub_results for result in sub_result]
+        
+        token_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        for sub_result in sub_results:
+            if sub_result and 'content_processing_tokens' in sub_result[0]:
+                for key in token_usage:
+                    token_usage[key] += sub_result[0]['content_processing_tokens'].get(key) or 0
+        
+        for result in results:
+            result['content_processing_tokens'] = token_usage
+        
+        return results
+    
+    async def _batch_extract_with_llm(self, content_items: List[str], 
                                      company_name: str, 
-                                     content_mapping: Dict) -> List[Dict]:
+                                     content_mapping: List[Dict]) -> List[Dict]:
         """
         Use LLM batch extraction focused on customer persona building.
         
+        The prompt is sent as a list of user messages (intro, one message per content
+        item, instructions) so the item texts are never joined into one large string.
+        
         Anti-hallucination measures implemented:
         - 7 critical anti-hallucination rules in system prompt
         - Explicit "Not mentioned" requirements for all missing data
@@ -334,175 +1024,41 @@ class ContentProcessor:
         Note: Uses default temperature (1.0) as required by gpt-5-mini model.
         Hallucination control achieved through strong prompt engineering.
         """
-        system_message = """You are a B2B customer persona analyst specializing in extracting ONLY factual information from source documents.
-
-CRITICAL ANTI-HALLUCINATION RULES (YOU MUST FOLLOW THESE):
-1. Extract ONLY information explicitly stated in the source text
-2. For each fact, include a direct quote or paraphrase from the source
-3. If information is not present in the text, you MUST write "Not mentioned"
-4. NEVER infer, assume, or generate information not in the source
-5. NEVER make up customer names, statistics, or quotes
-6. If you're uncertain about any information, mark it as "Uncertain: [your note]"
-7. Distinguish between what customers say vs. what the company claims
-
-PRIMARY GOAL: Extract factual intelligence to build accurate B2B customer personas.
-
-EXTRACTION FRAMEWORK (6 Categories):
-
-1. CURRENT CUSTOMERS & TARGET MARKET
-   - Specific customer company names explicitly mentioned
-   - Industries and verticals served
-   - Company sizes (Enterprise/Mid-market/SMB)
-   - Geographic markets served
-   - Customer statistics and metrics
-   - Job roles of people at customer companies
-
-2. PRODUCTS & SERVICES
-   - Main products/services and their descriptions
-   - Key features and capabilities
-   - Product positioning and value proposition
-   - Use cases and applications
-   - How the product/service works
-
-3. CUSTOMER SUCCESS STORIES & USE CASES
-   - Customer testimonials and case studies
-   - Specific use cases and outcomes
-   - Problems solved for customers
-   - Results and metrics achieved
-   - Who at the customer company uses the product (roles/departments)
-
-4. CUSTOMER PAIN POINTS & NEEDS
-   - Problems customers face (as mentioned in content)
-   - Customer needs and requirements
-   - Challenges the product addresses
-   - Customer goals and objectives
-
-5. COMPANY PROFILE & MARKET POSITION
-   - Company size, revenue, employee count
-   - Market position and competitive advantages
-   - Key partnerships and integrations
-   - Industry recognition and awards
-   - Company history and milestones
-
-6. DECISION MAKERS & KEY PERSONNEL
-   - Executive team (names, titles)
-   - Key spokespeople and their backgrounds
-   - Leadership changes or announcements
-   - Relevant for understanding company direction
-
-VERIFICATION CHECKLIST before you output:
-✓ Every fact has a source quote or paraphrase
-✓ No information is inferred or assumed
-✓ Missing information is marked "Not mentioned"
-✓ Uncertain information is flagged
-✓ Customer quotes are in quotation marks"""
-
-        # Build prompt with focused 5-category persona framework
-        prompt_parts = [f"""Analyze the following web content about {company_name} and extract customer persona information for B2B sales intelligence.
-
-SOURCE CONTENT:
-{combined_content}
-
-INSTRUCTIONS:
-Extract the 6 categories below for each content item separately. Be precise, factual, and include source quotes.
-"""]
-
-        # Add extraction template for each content item
-        for i in range(len(content_mapping)):
-            mapping = content_mapping[i]
-            prompt_parts.append(f"""
-
-═══════════════════════════════════════════════════════════
-**CONTENT ITEM {i+1}** ({mapping['type']})
-URL: {mapping['url']}
-═══════════════════════════════════════════════════════════
-
-1. **CURRENT CUSTOMERS & TARGET MARKET**
-   Extract ONLY if explicitly mentioned:
-   • Customer company names: [list with source quotes]
-   • Industries and company sizes: [with source quotes]
-   • Geographic markets: [regions with source quotes]
-   • Job roles at customer companies: [titles with source quotes]
-   • Customer statistics: [e.g., "85% of Fortune 100" with source quote]
-   
-   If no information found, write: "Not mentioned"
-
-2. **PRODUCTS & SERVICES**
-   Extract ONLY if explicitly mentioned:
-   • Main products/services: [descriptions with source quotes]
-   • Key features and capabilities: [with source quotes]
-   • Product positioning and value proposition: [with source quotes]
-   • Use cases and applications: [with source quotes]
-   
-   If no information found, write: "Not mentioned"
-
-3. **CUSTOMER SUCCESS STORIES & USE CASES**
-   Extract ONLY if explicitly mentioned:
-   • Customer testimonials and case studies: [with exact quotes and attribution]
-   • Specific use cases and outcomes: [with source quotes]
-   • Problems solved for customers: [with source quotes]
-   • Results and metrics achieved: [specific numbers with source quotes]
-   • User roles at customer companies: [titles/departments with source quotes]
-   
-   If no information found, write: "Not mentioned"
+        # Build prompt with focused 6-category persona framework
+        prompt_segments = [f"""Analyze the following web content about {company_name} and extract customer persona information for B2B sales intelligence.
 
-4. **CUSTOMER PAIN POINTS & NEEDS**
-   Extract ONLY if explicitly mentioned:
-   • Problems customers face: [as mentioned in content with quotes]
-   • Customer needs and requirements: [with source quotes]
-   • Challenges the product addresses: [with source quotes]
-   • Customer goals and objectives: [with source quotes]
-   
-   If no information found, write: "Not mentioned"
+SOURCE CONTENT:"""]
+        prompt_segments.extend(content_items)
 
-5. **COMPANY PROFILE & MARKET POSITION**
-   Extract ONLY if explicitly mentioned:
-   • Company size, revenue, employee count: [with source quotes]
-   • Market position and competitive advantages: [with source quotes]
-   • Key partnerships and integrations: [with source quotes]
-   • Industry recognition and awards: [with source quotes]
-   
-   If no information found, write: "Not mentioned"
+        prompt_parts = [_INSTRUCTIONS_HEADER, _CATEGORY_TEMPLATE, _ITEM_LIST_HEADER]
 
-6. **DECISION MAKERS & KEY PERSONNEL**
-   Extract ONLY if explicitly mentioned:
-   • Executive team names and titles: [with source quotes]
-   • Key spokespeople and their backgrounds: [with source quotes]
-   • Leadership changes or announcements: [with source quotes]
-   
-   If no information found, write: "Not mentioned"
-""")
-
-        prompt_parts.append("""
-
-═══════════════════════════════════════════════════════════
-FINAL REMINDERS BEFORE YOU RESPOND:
-═══════════════════════════════════════════════════════════
-✓ Extract information SEPARATELY for each content item in the order shown above
-✓ Include direct quotes (in "quotation marks") for every fact
-✓ Write "Not mentioned" for any category with no information in that content item
-✓ Do NOT infer or generate information not explicitly in the source
-✓ Do NOT mix information between different content items
-✓ Do NOT make up company names, statistics, or quotes
-✓ If uncertain about anything, mark it: "Uncertain: [explain why]"
+        # List the content items the categories apply to
+        prompt_parts.extend(
+            _ITEM_TEMPLATE.format(idx=i + 1, ctype=mapping['type'], url=mapping['url'])
+            for i, mapping in enumerate(content_mapping)
+        )
 
-Now extract the persona information:
-""")
+        prompt_parts.append(_FINAL_REMINDERS)
 
-        prompt = "".join(prompt_parts)
+        prompt_segments.append("".join(prompt_parts))
+        prompt_chars = sum(len(segment) for segment in prompt_segments) + len(_BATCH_SYSTEM_MESSAGE)
+        estimated_tokens = prompt_chars // CHARS_PER_TOKEN + BATCH_MAX_COMPLETION_TOKENS
 
         try:
-            response = await self.llm_service.generate_async(
-                prompt=prompt,
-                system_message=system_message,
-                max_completion_tokens=15000  # Adjusted for 6 categories (vs original 14)
-                # Using default temperature (1.0) as required by gpt-5-mini
-                # Hallucination control relies on strong prompt engineering:
-                # - 7 anti-hallucination rules in system message
-                # - Mandatory source citations
-                # - "Not mentioned" requirements
-                # - Structured output format with validation checklist
-            )
+            async with _get_llm_semaphore():
+                await _token_bucket.acquire(estimated_tokens)
+                response = await self.llm_service.generate_async(
+                    prompt=prompt_segments,
+                    system_message=_BATCH_SYSTEM_MESSAGE,
+                    max_completion_tokens=BATCH_MAX_COMPLETION_TOKENS,
+                    response_format={"type": "json_object"}
+                    # Using default temperature (1.0) as required by gpt-5-mini
+                    # Hallucination control relies on strong prompt engineering:
+                    # - 7 anti-hallucination rules in system message
+                    # - Mandatory source citations
+                    # - "Not mentioned" requirements
+                    # - Structured output format with validation checklist
+                )
             
             extracted_content = response.content.strip()
             
@@ -531,24 +1087,26 @@ Now extract the persona information:
             logger.error(f"Batch LLM persona extraction failed: {str(e)}")
             raise e
 
-    def _parse_batch_llm_output(self, llm_output: str, content_mapping: Dict) -> List[Dict]:
+    def _parse_batch_llm_output(self, llm_output: str, content_mapping: List[Dict]) -> List[Dict]:
         """
         Parse LLM batch output, assign corresponding analysis results to each content item
         
         Args:
             llm_output: Raw LLM output
-            content_mapping: Content item mapping
+            content_mapping: Content item mappings in prompt order
             
         Returns:
             Parsed result list
         """
         results = []
         
-        # Try to split LLM output by content items
-        content_sections = self._split_llm_output_by_content(llm_output, content_mapping)
+        content_sections = self._parse_json_sections(llm_output, content_mapping)
+        if content_sections is None:
+            # Not JSON: split the free-form output by content item headers
+            content_sections = self._split_llm_output_by_content(llm_output, content_mapping)
         
-        for i, mapping in content_mapping.items():
-            if i < len(content_sections):
+        for i, mapping in enumerate(content_mapping):
+            if i < len(content_sections) and content_sections[i] is not None:
                 # Use corresponding analysis results
                 processed_content = content_sections[i]
             else:
@@ -560,85 +1118,90 @@ Now extract the persona information:
                 'processed_content': processed_content,
                 'type': mapping['type']
             })
+            
+            # Items with identical content share the same analysis
+            for alias in mapping.get('aliases', []):
+                results.append({
+                    'url': alias['url'],
+                    'processed_content': processed_content,
+                    'type': alias['type']
+                })
         
         return results
     
-    def _split_llm_output_by_content(self, llm_output: str, content_mapping: Dict) -> List[str]:
+    def _parse_json_sections(self, llm_output: str, content_mapping: List[Dict]) -> Optional[List[Optional[str]]]:
         """
-        Split LLM output by content items
+        Parse structured JSON output into one markdown section per content item
         
         Args:
             llm_output: Raw LLM output
-            content_mapping: Content item mapping
+            content_mapping: Content item mappings in prompt order
             
         Returns:
-            Split content list
-        """
-        sections = []
-        
-        # Try to split by "Content Item X"
-        import re
-        pattern = r'\*\*Content Item \d+\s*\([^)]+\)\s*-\s*[^*]+\*\*:'
-        matches = list(re.finditer(pattern, llm_output))
-        
-        if len(matches) >= len(content_mapping):
-            # If enough split points found
-            for i, match in enumerate(matches):
-                start = match.end()
-                if i + 1 < len(matches):
-                    end = matches[i + 1].start()
-                else:
-                    end = len(llm_output)
-                
-                section_content = llm_output[start:end].strip()
-                sections.append(section_content)
-        else:
-            # If splitting fails, for single content item return entire output directly
-            if len(content_mapping) == 1:
-                sections = [llm_output]
-            else:
-                # For multiple content items, try other methods
-                sections = self._fallback_split(llm_output, len(content_mapping))
+            One rendered section per content item (None for items missing from the
+            output), or None if the output is not the expected JSON
+        """
+        # Clean markdown code block markers
+        cleaned_output = llm_output.strip()
+        if cleaned_output.startswith('```json'):
+            cleaned_output = cleaned_output[7:]
+        elif cleaned_output.startswith('```'):
+            cleaned_output = cleaned_output[3:]
+        if cleaned_output.endswith('```'):
+            cleaned_output = cleaned_output[:-3]
+        
+        try:
+            data = orjson.loads(cleaned_output)
+        except orjson.JSONDecodeError:
+            return None
         
-        return sections
+        items = data.get('items') if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            return None
+        
+        sections_by_number = {}
+        for position, item in enumerate(items, start=1):
+            if not isinstance(item, dict):
+                continue
+            try:
+                number = int(item.get('item', position))
+            except (TypeError, ValueError):
+                number = position
+            categories = item.get('categories')
+            sections_by_number.setdefault(
+                number, _render_categories(categories if isinstance(categories, dict) else {})
+            )
+        
+        return [sections_by_number.get(i + 1) for i in range(len(content_mapping))]
     
-    def _fallback_split(self, llm_output: str, num_sections: int) -> List[str]:
+    def _split_llm_output_by_content(self, llm_output: str, content_mapping: List[Dict]) -> List[str]:
         """
-        Fallback splitting method
+        Split LLM output by content items in a single pass over the item headers
+        
+        Each header's body runs up to the next header and is assigned by the item number
+        in the header. Items the model did not answer get the entire output.
         
         Args:
             llm_output: Raw LLM output
-            num_sections: Required number of sections
+            content_mapping: Content item mappings in prompt order
             
         Returns:
-            Split content list
+            Split content list, one entry per content item
         """
-        if num_sections <= 1:
-            return [llm_output]
+        sections_by_number = {}
+        matches = list(_SECTION_HEADER_RE.finditer(llm_output))
         
-        # Split by paragraphs
-        paragraphs = llm_output.split('\n\n')
+        for match, next_match in zip(matches, matches[1:] + [None]):
+            end = next_match.start() if next_match else len(llm_output)
+            # Keep the first answer if the model repeats an item header
+            sections_by_number.setdefault(int(match.group(1)), llm_output[match.end():end].strip())
         
-        if len(paragraphs) >= num_sections:
-            # Distribute paragraphs evenly
-            section_size = len(paragraphs) // num_sections
-            sections = []
-            
-            for i in range(num_sections):
-                start = i * section_size
-                if i == num_sections - 1:
-                    # Last section contains all remaining paragraphs
-                    end = len(paragraphs)
-                else:
-                    end = (i + 1) * section_size
-                
-                section_content = '\n\n'.join(paragraphs[start:end])
-                sections.append(section_content)
-            
-            return sections
-        else:
-            # If not enough paragraphs, use complete output for each content item
-            return [llm_output] * num_sections
+        sections = [sections_by_number.get(i + 1) for i in range(len(content_mapping))]
+        missing = sum(1 for section in sections if section is None)
+        if missing and len(content_mapping) > 1:
+            logger.warning(f"LLM output has no section for {missing} of {len(content_mapping)} content items")
+        
+        return [llm_output if section is None else section for section in sections]
 
     def get_processing_stats(self, original_content: str, processed_content: str) -> Dict:
         """
@@ -3,14 +3,52 @@ CRM Data Loader - Handles multiple CSV files with different structures
 Intelligently processes multiple CSV files exported from different CRM systems,
 automatically identifying, mapping, and merging data
 """
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 import glob
+import re
+import charset_normalizer
+import codecs
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import logging
 
+try:
+    # Optional multithreaded CSV reader; pandas is used when pyarrow is not installed
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+    pacsv = None
+
 logger = logging.getLogger(__name__)
 
+# Maximum number of rows read from each CRM CSV file
+MAX_ROWS_PER_FILE = 10000
+
+# Bytes sampled from the start of a file to detect its encoding
+ENCODING_SAMPLE_BYTES = 65536
+
+# Encoding for non-UTF-8 files without a BOM: Excel's default export on Western systems
+FALLBACK_ENCODING = 'cp1252'
+
+# Multi-byte CJK guesses are only trusted with at least this charset_normalizer coherence;
+# short Latin-1/CP1252 samples are otherwise readily misread as e.g. big5
+CJK_MIN_COHERENCE = 0.5
+
+CJK_ENCODINGS = frozenset({
+    'big5', 'big5hkscs', 'cp932', 'cp949', 'cp950', 'euc_jis_2004', 'euc_jisx0213', 'euc_jp',
+    'euc_kr', 'gb2312', 'gb18030', 'gbk', 'hz', 'iso2022_jp', 'iso2022_kr', 'johab',
+    'shift_jis', 'shift_jis_2004', 'shift_jisx0213'
+})
+
+# Maximum number of CSV files parsed concurrently
+MAX_LOAD_WORKERS = 8
+
 
 class CRMDataLoader:
     """
@@ -23,13 +61,44 @@ class CRMDataLoader:
     
     # File type identification patterns
     FILE_TYPE_PATTERNS = {
-        'account': ['account', 'company', 'organization', 'account'],
-        'contact': ['contact', 'person', 'lead'],
-        'opportunity': ['opportunity', 'deal', 'transaction', 'sales'],
-        'campaign': ['campaign', 'marketing'],
-        'task': ['task', 'activity', 'event']
+        'account': ('account', 'company', 'organization'),
+        'contact': ('contact', 'person', 'lead'),
+        'opportunity': ('opportunity', 'deal', 'transaction', 'sales'),
+        'campaign': ('campaign', 'marketing'),
+        'task': ('task', 'activity', 'event')
     }
     
+    # One compiled alternation per file type, checked in FILE_TYPE_PATTERNS order
+    FILE_TYPE_PATTERNS_RE = tuple(
+        (file_type, re.compile('|'.join(map(re.escape, patterns))))
+        for file_type, patterns in FILE_TYPE_PATTERNS.items()
+    )
+    
+    # Column-name indicators used when the filename does not reveal the file type
+    ACCOUNT_COLUMNS_RE = re.compile('account|company|organization|billing|shipping|industry')
+    CONTACT_COLUMNS_RE = re.compile('firstname|lastname|email|title|department')
+    OPPORTUNITY_COLUMNS_RE = re.compile('stage|amount|closedate|deal|opportunity')
+    
+    # Column-name indicators of each CRM system, checked in priority order
+    CRM_SYSTEM_COLUMNS_RE = (
+        ('salesforce', re.compile('billing|shipping|stagename|systemmodstamp|recordtypeid')),
+        ('hubspot', re.compile('hs_|hubspot|dealstage|dealname')),
+        ('pipedrive', re.compile('pipedrive|org_id|person_id'))
+    )
+    
+    # Standard field name prefix for each file type with mapped fields
+    FILE_TYPE_FIELD_PREFIXES = {
+        'account': 'company_',
+        'contact': 'contact_',
+        'opportunity': 'deal_'
+    }
+    
+    # Low-cardinality standard fields stored as categoricals once a file is normalized
+    CATEGORICAL_COLUMNS = (
+        'company_industry', 'company_country', 'company_state',
+        'contact_department', 'deal_stage'
+    )
+    
     # Standard field mappings for different CRM systems
     FIELD_MAPPINGS = {
         # Company/Account fields
@@ -154,28 +223,40 @@ class CRMDataLoader:
             File type: 'account', 'contact', 'opportunity', 'campaign', 'task', or None
         """
         filename_lower = filename.lower()
-        columns_lower = [col.lower() for col in df.columns]
         
         # Check filename patterns first
-        for file_type, patterns in CRMDataLoader.FILE_TYPE_PATTERNS.items():
-            if any(pattern in filename_lower for pattern in patterns):
+        for file_type, pattern_re in CRMDataLoader.FILE_TYPE_PATTERNS_RE:
+            if pattern_re.search(filename_lower):
                 return file_type
         
         # Check column patterns as fallback
+        person_file = 'contact' in filename_lower or 'person' in filename_lower
+        return CRMDataLoader._identify_by_columns(tuple(df.columns), person_file)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _identify_by_columns(columns: Tuple[str, ...], person_file: bool) -> Optional[str]:
+        """
+        Identify the file type from column names; cached because exports of the same
+        table (e.g. monthly files) share their header
+        
+        Args:
+            columns: Column names
+            person_file: Whether the filename names contacts/persons, which rules out accounts
+        """
+        columns_str = ' '.join(col.lower() for col in columns)
+        
         # Account/Company indicators
-        account_indicators = ['account', 'company', 'organization', 'billing', 'shipping', 'industry']
-        if any(indicator in ' '.join(columns_lower) for indicator in account_indicators):
-            if 'contact' not in filename_lower and 'person' not in filename_lower:
+        if CRMDataLoader.ACCOUNT_COLUMNS_RE.search(columns_str):
+            if not person_file:
                 return 'account'
         
         # Contact indicators
-        contact_indicators = ['firstname', 'lastname', 'email', 'title', 'department']
-        if any(indicator in ' '.join(columns_lower) for indicator in contact_indicators):
+        if CRMDataLoader.CONTACT_COLUMNS_RE.search(columns_str):
             return 'contact'
         
         # Opportunity indicators
-        opportunity_indicators = ['stage', 'amount', 'closedate', 'deal', 'opportunity']
-        if any(indicator in ' '.join(columns_lower) for indicator in opportunity_indicators):
+        if CRMDataLoader.OPPORTUNITY_COLUMNS_RE.search(columns_str):
             return 'opportunity'
         
         return None
@@ -188,23 +269,40 @@ class CRMDataLoader:
         Returns:
             CRM system: 'salesforce', 'hubspot', 'pipedrive', or 'generic'
         """
-        columns_lower = [col.lower() for col in df.columns]
-        columns_str = ' '.join(columns_lower)
-        
-        # Salesforce indicators
-        if any(indicator in columns_str for indicator in ['billing', 'shipping', 'stagename', 'systemmodstamp', 'recordtypeid']):
-            return 'salesforce'
-        
-        # HubSpot indicators
-        if any(indicator in columns_str for indicator in ['hs_', 'hubspot', 'dealstage', 'dealname']):
-            return 'hubspot'
+        return CRMDataLoader._detect_system_by_columns(tuple(df.columns))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _detect_system_by_columns(columns: Tuple[str, ...]) -> str:
+        """Detect the CRM system from column names; cached per distinct header"""
+        columns_str = ' '.join(col.lower() for col in columns)
         
-        # Pipedrive indicators
-        if any(indicator in columns_str for indicator in ['pipedrive', 'org_id', 'person_id']):
-            return 'pipedrive'
+        for crm_system, indicators_re in CRMDataLoader.CRM_SYSTEM_COLUMNS_RE:
+            if indicators_re.search(columns_str):
+                return crm_system
         
         return 'generic'
     
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _field_candidates(file_type: str, crm_system: str) -> Tuple[Tuple[str, Tuple[str, ...], Tuple[str, ...]], ...]:
+        """
+        Candidate source columns for each standard field of a file type, computed once
+        
+        Returns:
+            Tuple of (standard_field, crm_specific_columns, generic_columns) in
+            FIELD_MAPPINGS order; empty for file types without standard fields
+        """
+        prefix = CRMDataLoader.FILE_TYPE_FIELD_PREFIXES.get(file_type)
+        if prefix is None:
+            return ()
+        
+        return tuple(
+            (standard_field, tuple(crm_mappings.get(crm_system, ())), tuple(crm_mappings.get('generic', ())))
+            for standard_field, crm_mappings in CRMDataLoader.FIELD_MAPPINGS.items()
+            if standard_field.startswith(prefix)
+        )
+    
     @staticmethod
     def map_columns_to_standard(df: pd.DataFrame, file_type: str, crm_system: str) -> pd.DataFrame:
         """
@@ -218,41 +316,113 @@ class CRMDataLoader:
         Returns:
             DataFrame with standardized column names
         """
-        df_mapped = df.copy()
+        column_mapping = CRMDataLoader._column_mapping(df.columns, file_type, crm_system)
+        
+        # Apply mapping; only labels change, so the data blocks are shared with df
+        return df.rename(columns=column_mapping, copy=False)
+    
+    @staticmethod
+    def _column_mapping(columns, file_type: str, crm_system: str) -> Dict[str, str]:
+        """
+        Build the {source_column: standard_field} mapping for the given columns
+        
+        CRM-specific column names are preferred, then generic ones, in FIELD_MAPPINGS order.
+        """
         column_mapping = {}
+        columns = set(columns)
         
-        # Get relevant fields for this file type
-        relevant_fields = {}
-        if file_type == 'account':
-            relevant_fields = {k: v for k, v in CRMDataLoader.FIELD_MAPPINGS.items() 
-                             if k.startswith('company_')}
-        elif file_type == 'contact':
-            relevant_fields = {k: v for k, v in CRMDataLoader.FIELD_MAPPINGS.items() 
-                             if k.startswith('contact_')}
-        elif file_type == 'opportunity':
-            relevant_fields = {k: v for k, v in CRMDataLoader.FIELD_MAPPINGS.items() 
-                             if k.startswith('deal_')}
-        
-        # Find matching columns
-        for standard_field, crm_mappings in relevant_fields.items():
-            # Try CRM-specific mappings first
-            if crm_system in crm_mappings:
-                for crm_field in crm_mappings[crm_system]:
-                    if crm_field in df.columns:
-                        column_mapping[crm_field] = standard_field
-                        break
-            
-            # Fallback to generic mappings
-            if standard_field not in column_mapping.values():
-                for crm_field in crm_mappings.get('generic', []):
-                    if crm_field in df.columns:
-                        column_mapping[crm_field] = standard_field
-                        break
+        for standard_field, system_fields, generic_fields in CRMDataLoader._field_candidates(file_type, crm_system):
+            crm_field = next((field for field in system_fields if field in columns), None)
+            if crm_field is None:
+                crm_field = next((field for field in generic_fields if field in columns), None)
+            if crm_field is not None:
+                column_mapping[crm_field] = standard_field
+        
+        return column_mapping
+    
+    @staticmethod
+    def _detect_encoding(file_path: str) -> str:
+        """
+        Detect a CSV file's encoding from its first ENCODING_SAMPLE_BYTES bytes
         
-        # Apply mapping
-        df_mapped = df_mapped.rename(columns=column_mapping)
+        BOMs and BOM-less UTF-16 are recognized first, then the sample is checked as
+        strict UTF-8. Anything else is read as FALLBACK_ENCODING unless charset_normalizer
+        is confident it is a multi-byte CJK encoding; its single-byte guesses (cp1250,
+        big5 for short rows, ...) silently garble Western exports.
+        
+        Returns:
+            Python codec name
+        """
+        with open(file_path, 'rb') as f:
+            sample = f.read(ENCODING_SAMPLE_BYTES)
+        
+        if sample.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        if sample.startswith((codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE)):
+            return 'utf-32'
+        if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return 'utf-16'
+        
+        # BOM-less UTF-16: ASCII text has a NUL in every other byte
+        if sample.count(b'\x00') * 4 > len(sample):
+            odd_nuls = sample[1::2].count(b'\x00')
+            even_nuls = sample[0::2].count(b'\x00')
+            return 'utf-16-le' if odd_nuls >= even_nuls else 'utf-16-be'
+        
+        # A truncated sample may end inside a multi-byte character; keep whole lines only
+        truncated = len(sample) == ENCODING_SAMPLE_BYTES
+        if truncated and b'\n' in sample:
+            sample = sample[:sample.rfind(b'\n') + 1]
+        
+        try:
+            sample.decode('utf-8')
+            return 'utf-8'
+        except UnicodeDecodeError as e:
+            if truncated and e.reason == 'unexpected end of data':
+                return 'utf-8'
+        
+        best_match = charset_normalizer.from_bytes(sample).best()
+        if (best_match is not None and best_match.encoding in CJK_ENCODINGS
+                and best_match.coherence >= CJK_MIN_COHERENCE):
+            return best_match.encoding
+        return FALLBACK_ENCODING
+    
+    @staticmethod
+    def _read_csv_fast(file_path: str, encoding: str, usecols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Read up to MAX_ROWS_PER_FILE rows of a CSV file, using pyarrow when available
+        
+        pyarrow streams the file in 1 MiB blocks with a multithreaded parser and stops
+        once enough rows are read; files it cannot parse are read with pandas.
+        
+        Args:
+            file_path: Path to CSV file
+            encoding: Text encoding of the file
+            usecols: Columns to parse, or None for all columns
+        
+        Raises:
+            UnicodeDecodeError: If the file cannot be decoded with the given encoding
+        """
+        if pacsv is not None:
+            try:
+                reader = pacsv.open_csv(
+                    file_path,
+                    read_options=pacsv.ReadOptions(encoding=encoding, block_size=1 << 20),
+                    convert_options=pacsv.ConvertOptions(strings_can_be_null=True, include_columns=usecols)
+                )
+                batches = []
+                row_count = 0
+                for batch in reader:
+                    batches.append(batch)
+                    row_count += batch.num_rows
+                    if row_count >= MAX_ROWS_PER_FILE:
+                        break
+                table = pa.Table.from_batches(batches, schema=reader.schema)
+                return table.slice(0, MAX_ROWS_PER_FILE).to_pandas(split_blocks=True, self_destruct=True)
+            except (pa.ArrowInvalid, KeyError) as e:
+                logger.debug(f"pyarrow could not parse {file_path}, falling back to pandas: {e}")
         
-        return df_mapped
+        return pd.read_csv(file_path, low_memory=False, nrows=MAX_ROWS_PER_FILE, encoding=encoding, usecols=usecols)
     
     @staticmethod
     def load_and_normalize_csv(file_path: str) -> Optional[Dict[str, Any]]:
@@ -268,20 +438,29 @@ class CRMDataLoader:
         try:
             filename = Path(file_path).name
             
-            # Read CSV (handle large files and encoding issues)
+            # Read CSV once with the detected encoding; latin-1 decodes any byte sequence,
+            # so it is the fallback when detection was wrong
             df = None
-            encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252', 'utf-16']
+            encoding = CRMDataLoader._detect_encoding(file_path)
             
-            for encoding in encodings:
+            for attempt_encoding in dict.fromkeys([encoding, 'latin-1']):
                 try:
-                    df = pd.read_csv(file_path, low_memory=False, nrows=10000, encoding=encoding)
-                    if encoding != 'utf-8':
-                        logger.debug(f"Read {filename} with {encoding} encoding")
+                    # Classify the file from its header, then parse only the columns that
+                    # map to standard fields (all columns for types without mappings)
+                    header = pd.read_csv(file_path, nrows=0, encoding=attempt_encoding)
+                    file_type = CRMDataLoader.identify_file_type(filename, header)
+                    crm_system = CRMDataLoader.detect_crm_system(header)
+                    column_mapping = CRMDataLoader._column_mapping(header.columns, file_type or 'generic', crm_system)
+                    usecols = [col for col in header.columns if col in column_mapping] or None
+                    
+                    df = CRMDataLoader._read_csv_fast(file_path, attempt_encoding, usecols)
+                    if attempt_encoding != 'utf-8':
+                        logger.debug(f"Read {filename} with {attempt_encoding} encoding")
                     break
                 except UnicodeDecodeError:
                     continue
                 except Exception as e:
-                    logger.warning(f"Failed to read {filename} with {encoding}: {e}")
+                    logger.warning(f"Failed to read {filename} with {attempt_encoding}: {e}")
                     continue
             
             if df is None:
@@ -292,21 +471,24 @@ class CRMDataLoader:
                 logger.warning(f"Empty file: {filename}")
                 return None
             
-            # Identify file type and CRM system
-            file_type = CRMDataLoader.identify_file_type(filename, df)
-            crm_system = CRMDataLoader.detect_crm_system(df)
-            
             logger.info(f"Loaded {filename}: type={file_type}, crm={crm_system}, rows={len(df)}")
             
             # Map columns to standard
             df_normalized = CRMDataLoader.map_columns_to_standard(df, file_type or 'generic', crm_system)
             
+            for col in CRMDataLoader.CATEGORICAL_COLUMNS:
+                if col in df_normalized.columns:
+                    df_normalized[col] = df_normalized[col].astype('category')
+            
+            # Column lists are only used for diagnostics, so skip building them unless debugging
+            debug = logger.isEnabledFor(logging.DEBUG)
+            
             return {
                 'file_type': file_type,
                 'crm_system': crm_system,
                 'filename': filename,
-                'original_columns': df.columns.tolist(),
-                'normalized_columns': df_normalized.columns.tolist(),
+                'original_columns': header.columns.tolist() if debug else None,
+                'normalized_columns': df_normalized.columns.tolist() if debug else None,
                 'data': df_normalized,
                 'row_count': len(df_normalized)
             }
@@ -338,8 +520,8 @@ class CRMDataLoader:
             logger.warning(f"CRM data directory not found: {crm_data_dir}")
             return crm_files
         
-        # Find all CSV files
-        csv_files = list(data_dir.glob("*.csv"))
+        # Find all CSV files; the listing is reused until the directory changes
+        csv_files = CRMDataLoader._scan_csv_files(str(data_dir), data_dir.stat().st_mtime_ns)
         
         if not csv_files:
             logger.warning(f"No CSV files found in {crm_data_dir}")
@@ -347,10 +529,13 @@ class CRMDataLoader:
         
         logger.info(f"Found {len(csv_files)} CSV files in {crm_data_dir}")
         
-        # Load and normalize each file
-        for csv_file in csv_files:
-            normalized_data = CRMDataLoader.load_and_normalize_csv(str(csv_file))
-            
+        # Load and normalize files in parallel; CSV parsing runs in C and releases the GIL
+        with ThreadPoolExecutor(max_workers=min(MAX_LOAD_WORKERS, len(csv_files))) as executor:
+            loaded_files = list(executor.map(
+                lambda csv_file: CRMDataLoader.load_and_normalize_csv(str(csv_file)), csv_files
+            ))
+        
+        for normalized_data in loaded_files:
             if normalized_data:
                 file_type = normalized_data['file_type'] or 'unknown'
                 
@@ -359,13 +544,18 @@ class CRMDataLoader:
                 
                 crm_files[file_type].append(normalized_data)
         
-        # Log summary
+        # Log summary; row totals are logged from the merged frames in merge_crm_data
         for file_type, files in crm_files.items():
-            total_rows = sum(f['row_count'] for f in files)
-            logger.info(f"Loaded {len(files)} {file_type} file(s) with {total_rows} total rows")
+            logger.info("Loaded %d %s file(s)", len(files), file_type)
         
         return crm_files
     
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _scan_csv_files(dir_path: str, mtime_ns: int) -> Tuple[Path, ...]:
+        """List the CSV files of a directory; cached per directory modification time"""
+        return tuple(Path(dir_path).glob("*.csv"))
+    
     @staticmethod
     def merge_crm_data(crm_files: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
         """
@@ -375,36 +565,21 @@ class CRMDataLoader:
             crm_files: Dictionary of loaded CRM files organized by type
             
         Returns:
-            Merged data summary with statistics and text representation
+            Merged data summary with statistics and text representation; 'accounts',
+            'contacts' and 'opportunities' are DataFrames (use .to_dict('records')
+            where row dicts are needed)
         """
+        # Concatenate the frames of each type, keeping their column dtypes
         merged_data = {
-            'accounts': [],
-            'contacts': [],
-            'opportunities': [],
+            'accounts': CRMDataLoader._concat_frames(crm_files.get('account', [])),
+            'contacts': CRMDataLoader._concat_frames(crm_files.get('contact', [])),
+            'opportunities': CRMDataLoader._concat_frames(crm_files.get('opportunity', [])),
             'statistics': {}
         }
         
-        # Merge accounts
-        if 'account' in crm_files:
-            for account_file in crm_files['account']:
-                df = account_file['data']
-                # Extract key fields
-                accounts = df.to_dict('records')
-                merged_data['accounts'].extend(accounts)
-        
-        # Merge contacts
-        if 'contact' in crm_files:
-            for contact_file in crm_files['contact']:
-                df = contact_file['data']
-                contacts = df.to_dict('records')
-                merged_data['contacts'].extend(contacts)
-        
-        # Merge opportunities
-        if 'opportunity' in crm_files:
-            for opp_file in crm_files['opportunity']:
-                df = opp_file['data']
-                opportunities = df.to_dict('records')
-                merged_data['opportunities'].extend(opportunities)
+        for key in ('accounts', 'contacts', 'opportunities'):
+            if not merged_data[key].empty:
+                logger.info("Merged %s with %d total rows", key, len(merged_data[key]))
         
         # Generate statistics
         merged_data['statistics'] = CRMDataLoader._generate_statistics(merged_data)
@@ -414,78 +589,120 @@ class CRMDataLoader:
         
         return merged_data
     
+    @staticmethod
+    def _concat_frames(files: List[Dict[str, Any]]) -> pd.DataFrame:
+        """Concatenate the normalized DataFrames of loaded files into one frame"""
+        if not files:
+            return pd.DataFrame()
+        
+        frames = [f['data'] for f in files]
+        # Each file gets its own categories at load time, and pd.concat turns categoricals
+        # with differing categories back into object columns, so share one set per column
+        for col in CRMDataLoader.CATEGORICAL_COLUMNS:
+            columns = [frame[col] for frame in frames if col in frame.columns]
+            if len(columns) < 2 or not all(isinstance(c.dtype, pd.CategoricalDtype) for c in columns):
+                continue
+            dtype = pd.CategoricalDtype(union_categoricals(columns).categories)
+            frames = [
+                frame.astype({col: dtype}) if col in frame.columns else frame
+                for frame in frames
+            ]
+        
+        return pd.concat(frames, ignore_index=True, copy=False)
+    
+    @staticmethod
+    def _top_counts(series: pd.Series, n: int) -> Dict[Any, int]:
+        """
+        Return the n most frequent values of a column, counted on categorical codes
+        
+        Ties keep the order in which the values first appear, as value_counts does on
+        the raw values (categorical value_counts would break them by category order).
+        """
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype('category')
+        codes = series.cat.codes.to_numpy()
+        codes = codes[codes >= 0]
+        counts = np.bincount(codes, minlength=len(series.cat.categories))
+        first_seen = pd.unique(codes)
+        order = first_seen[np.argsort(-counts[first_seen], kind='stable')][:n]
+        return dict(zip(series.cat.categories[order].tolist(), counts[order].tolist()))
+    
+    @staticmethod
+    def _numeric_stats(series: pd.Series) -> Optional[Dict[str, Any]]:
+        """Summarize a numeric column with numpy reductions over its non-null values"""
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return None
+        # Boolean indexing returned a private copy, so the median may partition it in place
+        return {
+            'mean': round(float(values.mean()), 2),
+            'median': round(float(np.median(values, overwrite_input=True)), 2),
+            'min': round(float(values.min()), 2),
+            'max': round(float(values.max()), 2),
+            'count': int(values.size)
+        }
+    
     @staticmethod
     def _generate_statistics(merged_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate statistics from merged CRM data"""
         stats = {}
         
         # Account statistics
-        if merged_data['accounts']:
-            accounts_df = pd.DataFrame(merged_data['accounts'])
+        accounts_df = merged_data['accounts']
+        if not accounts_df.empty:
             
             # Industry distribution
             if 'company_industry' in accounts_df.columns:
-                stats['industry_distribution'] = accounts_df['company_industry'].value_counts().head(20).to_dict()
+                stats['industry_distribution'] = CRMDataLoader._top_counts(accounts_df['company_industry'], 20)
             
             # Location distribution
             location_cols = ['company_country', 'company_state', 'company_city']
             for col in location_cols:
                 if col in accounts_df.columns:
-                    stats[f'{col}_distribution'] = accounts_df[col].value_counts().head(20).to_dict()
+                    stats[f'{col}_distribution'] = CRMDataLoader._top_counts(accounts_df[col], 20)
                     break
             
             # Company size statistics
             if 'company_size' in accounts_df.columns:
                 size_col = accounts_df['company_size']
                 if pd.api.types.is_numeric_dtype(size_col):
-                    non_null = size_col.dropna()
-                    if len(non_null) > 0:
-                        stats['company_size_stats'] = {
-                            'mean': round(float(non_null.mean()), 2),
-                            'median': round(float(non_null.median()), 2),
-                            'min': round(float(non_null.min()), 2),
-                            'max': round(float(non_null.max()), 2),
-                            'count': int(len(non_null))
-                        }
+                    numeric_stats = CRMDataLoader._numeric_stats(size_col)
+                    if numeric_stats:
+                        stats['company_size_stats'] = numeric_stats
         
         # Contact statistics
-        if merged_data['contacts']:
-            contacts_df = pd.DataFrame(merged_data['contacts'])
+        contacts_df = merged_data['contacts']
+        if not contacts_df.empty:
             
             # Job title distribution
             if 'contact_job_title' in contacts_df.columns:
-                stats['job_title_distribution'] = contacts_df['contact_job_title'].value_counts().head(30).to_dict()
+                stats['job_title_distribution'] = CRMDataLoader._top_counts(contacts_df['contact_job_title'], 30)
             
             # Department distribution
             if 'contact_department' in contacts_df.columns:
-                stats['department_distribution'] = contacts_df['contact_department'].value_counts().head(20).to_dict()
+                stats['department_distribution'] = CRMDataLoader._top_counts(contacts_df['contact_department'], 20)
         
         # Opportunity statistics
-        if merged_data['opportunities']:
-            opps_df = pd.DataFrame(merged_data['opportunities'])
+        opps_df = merged_data['opportunities']
+        if not opps_df.empty:
             
             # Deal stage distribution
             if 'deal_stage' in opps_df.columns:
-                stats['deal_stage_distribution'] = opps_df['deal_stage'].value_counts().head(20).to_dict()
+                stats['deal_stage_distribution'] = CRMDataLoader._top_counts(opps_df['deal_stage'], 20)
             
             # Deal amount statistics
             if 'deal_amount' in opps_df.columns:
                 amount_col = opps_df['deal_amount']
                 if pd.api.types.is_numeric_dtype(amount_col):
-                    non_null = amount_col.dropna()
-                    if len(non_null) > 0:
-                        stats['deal_amount_stats'] = {
-                            'mean': round(float(non_null.mean()), 2),
-                            'median': round(float(non_null.median()), 2),
-                            'min': round(float(non_null.min()), 2),
-                            'max': round(float(non_null.max()), 2),
-                            'count': int(len(non_null))
-                        }
+                    numeric_stats = CRMDataLoader._numeric_stats(amount_col)
+                    if numeric_stats:
+                        stats['deal_amount_stats'] = numeric_stats
         
         # Overall counts
-        stats['total_accounts'] = len(merged_data['accounts'])
-        stats['total_contacts'] = len(merged_data['contacts'])
-        stats['total_opportunities'] = len(merged_data['opportunities'])
+        stats['total_accounts'] = len(accounts_df)
+        stats['total_contacts'] = len(contacts_df)
+        stats['total_opportunities'] = len(opps_df)
         
         return stats
     
@@ -505,8 +722,10 @@ class CRMDataLoader:
         # Industry distribution
         if 'industry_distribution' in stats:
             summary_parts.append("--- Industry Distribution ---")
-            for industry, count in list(stats['industry_distribution'].items())[:10]:
-                summary_parts.append(f"  {industry}: {count}")
+            summary_parts.extend(
+                f"  {industry}: {count}"
+                for industry, count in itertools.islice(stats['industry_distribution'].items(), 10)
+            )
             summary_parts.append("")
         
         # Location distribution
@@ -514,8 +733,9 @@ class CRMDataLoader:
             if col in stats:
                 location_type = col.replace('_distribution', '').replace('company_', '')
                 summary_parts.append(f"--- {location_type.title()} Distribution ---")
-                for location, count in list(stats[col].items())[:10]:
-                    summary_parts.append(f"  {location}: {count}")
+                summary_parts.extend(
+                    f"  {location}: {count}" for location, count in itertools.islice(stats[col].items(), 10)
+                )
                 summary_parts.append("")
                 break
         
@@ -531,15 +751,16 @@ class CRMDataLoader:
         # Job title distribution
         if 'job_title_distribution' in stats:
             summary_parts.append("--- Top Job Titles ---")
-            for title, count in list(stats['job_title_distribution'].items())[:15]:
-                summary_parts.append(f"  {title}: {count}")
+            summary_parts.extend(
+                f"  {title}: {count}"
+                for title, count in itertools.islice(stats['job_title_distribution'].items(), 15)
+            )
             summary_parts.append("")
         
         # Deal stage distribution
         if 'deal_stage_distribution' in stats:
             summary_parts.append("--- Deal Stage Distribution ---")
-            for stage, count in stats['deal_stage_distribution'].items():
-                summary_parts.append(f"  {stage}: {count}")
+            summary_parts.extend(f"  {stage}: {count}" for stage, count in stats['deal_stage_distribution'].items())
             summary_parts.append("")
         
         # Deal amount stats
@@ -2,7 +2,11 @@
 """
 Service for aggregating and preparing data for generators
 """
-from typing import Dict, Optional
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 from ..services.data_store import get_data_store
 from ..controllers.scraping_controller import get_scraping_controller
@@ -10,12 +14,26 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Limits for PDF documents added to the context
+MAX_PDFS = 5
+MAX_CHARS_PER_PDF = 5000
+
+# Number of prepared contexts kept per aggregator
+CONTEXT_CACHE_SIZE = 16
+
+# Number of extracted (already truncated) PDF texts kept per aggregator
+PDF_CACHE_SIZE = 32
+
 
 class DataAggregator:
     """Service for aggregating and preparing data for generators"""
     
     def __init__(self):
         self.data_store = get_data_store()
+        # Truncated PDF text per path, reused while the file's mtime and size are unchanged
+        self._pdf_cache: "OrderedDict[str, Tuple[Tuple[int, int], Dict[str, Any]]]" = OrderedDict()
+        # Prepared (context, tokens) keyed by the request options and source file signatures
+        self._context_cache: "OrderedDict[Tuple, Tuple[str, dict]]" = OrderedDict()
     
     async def prepare_context(self, company_name: str, max_chars: int = 15000,
                              include_news: bool = True,
@@ -47,6 +65,15 @@ class DataAggregator:
         Returns:
             Tuple of (context string, content processing tokens dict)
         """
+        cache_key = self._context_cache_key(
+            company_name, max_chars, include_crm, include_pdf, crm_folder, pdf_folder
+        )
+        if cache_key is not None and cache_key in self._context_cache:
+            self._context_cache.move_to_end(cache_key)
+            full_context, content_processing_tokens = self._context_cache[cache_key]
+            logger.info(f"[DataAggregator] Reusing prepared context for {company_name}")
+            return full_context, dict(content_processing_tokens)
+        
         context_parts = []
         content_processing_tokens = {}
         
@@ -100,21 +127,25 @@ class DataAggregator:
         
         # Add scraped content (cleaned)
         for item in scraped_data.get("scraped_content", []):
-            if item.get("success"):
-                content_type = item.get("content_type", "unknown")
-                url = item.get("url", "")
-                # Use processed content (cleaned and LLM-processed)
-                markdown = item.get("processed_markdown") or item.get("markdown", "")
-                
-                if not markdown:
-                    continue
-                
-                if char_count + len(markdown) > max_chars:
-                    break
-                
-                context_parts.append(f"\n--- {content_type.upper()} ---\n"
-                                   f"URL: {url}\n\n{markdown}")
-                char_count += len(context_parts[-1])
+            if not item.get("success"):
+                continue
+            
+            # Use processed content (cleaned and LLM-processed)
+            markdown = item.get("processed_markdown") or item.get("markdown")
+            if not markdown:
+                continue
+            
+            # Size the section from its parts; header and markdown are kept as separate
+            # parts (the final join supplies the newline between them) so large
+            # markdown is copied only once, into the joined context
+            header = f"\n--- {item.get('content_type', 'unknown').upper()} ---\nURL: {item.get('url', '')}\n"
+            section_chars = len(header) + 1 + len(markdown)
+            if char_count + section_chars > max_chars:
+                break
+            
+            context_parts.append(header)
+            context_parts.append(markdown)
+            char_count += section_chars
         
         logger.info(f"✅ Web content loaded: {char_count} chars")
         
@@ -138,7 +169,7 @@ class DataAggregator:
         # 3. PDF DOCUMENTS (Optional)
         # ========================================
         if include_pdf:
-            pdf_summary = self._load_pdf_context(pdf_folder)
+            pdf_summary = await self._load_pdf_context(pdf_folder)
             if pdf_summary:
                 context_parts.append("\n\n" + "=" * 80)
                 context_parts.append("PDF DOCUMENTS")
@@ -154,8 +185,49 @@ class DataAggregator:
         full_context = "\n".join(context_parts)
         logger.info(f"[DataAggregator] Total context prepared: {len(full_context)} chars")
         
+        if cache_key is not None:
+            self._context_cache[cache_key] = (full_context, dict(content_processing_tokens))
+            if len(self._context_cache) > CONTEXT_CACHE_SIZE:
+                self._context_cache.popitem(last=False)
+        
         return full_context, content_processing_tokens
     
+    def _context_cache_key(self, company_name: str, max_chars: int, include_crm: bool,
+                           include_pdf: bool, crm_folder: str, pdf_folder: str) -> Optional[Tuple]:
+        """
+        Build the prepare_context cache key, or None when there is no saved scrape yet
+        
+        The key includes the latest scraped file and the name, mtime and size of every
+        CRM/PDF file used, so a new scrape or any changed source file misses the cache.
+        """
+        latest_file = self.data_store.find_latest_scraped_file(company_name)
+        if latest_file is None:
+            return None
+        
+        try:
+            scraped_mtime = latest_file.stat().st_mtime_ns
+        except OSError:
+            return None
+        
+        return (
+            company_name, max_chars, include_crm, include_pdf, crm_folder, pdf_folder,
+            str(latest_file), scraped_mtime,
+            self._folder_signature(crm_folder, '.csv') if include_crm else None,
+            self._folder_signature(pdf_folder, '.pdf') if include_pdf else None
+        )
+    
+    @staticmethod
+    def _folder_signature(folder: str, suffix: str) -> Tuple[Tuple[str, int, int], ...]:
+        """Name, mtime and size of the files with the given suffix in a folder"""
+        try:
+            with os.scandir(folder) as entries:
+                return tuple(sorted(
+                    (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                    for entry in entries if entry.name.lower().endswith(suffix)
+                ))
+        except OSError:
+            return ()
+    
     def _load_crm_context(self, crm_folder: str = "crm-data") -> Optional[str]:
         """
         Load CRM customer data summary for persona generation
@@ -174,10 +246,14 @@ class DataAggregator:
             logger.warning(f"Failed to load CRM data from {crm_folder}: {e}")
             return None
     
-    def _load_pdf_context(self, pdf_folder: str = "pdf-data") -> Optional[str]:
+    async def _load_pdf_context(self, pdf_folder: str = "pdf-data") -> Optional[str]:
         """
         Load all PDF documents from specified folder
         
+        Uncached PDFs are extracted one after another in a single executor call, since
+        PyMuPDF is not safe to use from several threads at once; unchanged files are
+        served from the extraction cache.
+        
         Args:
             pdf_folder: Folder containing PDF files
             
@@ -199,27 +275,58 @@ class DataAggregator:
             
             pdf_service = PDFService()
             pdf_contents = []
-            max_pdfs = 5  # Limit to 5 PDFs to avoid context overflow
-            max_chars_per_pdf = 5000  # Limit each PDF to 5000 chars
             
             logger.info(f"Found {len(pdf_files)} PDF file(s) in {pdf_folder}")
             
-            for pdf_file in pdf_files[:max_pdfs]:
+            # Limit the number of PDFs to avoid context overflow
+            pdf_files = pdf_files[:MAX_PDFS]
+            documents = {}
+            pending = []
+            for pdf_file in pdf_files:
+                path = str(pdf_file)
                 try:
-                    result = pdf_service.extract_text(str(pdf_file))
-                    pdf_text = result['extracted_text']
-                    
-                    # Truncate if too long
-                    if len(pdf_text) > max_chars_per_pdf:
-                        pdf_text = pdf_text[:max_chars_per_pdf] + "\n... [truncated]"
-                    
-                    pdf_contents.append(
-                        f"\n--- PDF: {result['filename']} ({result['page_count']} pages) ---\n"
-                        f"{pdf_text}"
-                    )
-                    logger.debug(f"Loaded PDF: {result['filename']} ({result['text_length']} chars)")
-                except Exception as e:
+                    stat = pdf_file.stat()
+                except OSError as e:
                     logger.warning(f"Failed to load {pdf_file.name}: {e}")
+                    continue
+                
+                signature = (stat.st_mtime_ns, stat.st_size)
+                cached = self._pdf_cache.get(path)
+                if cached is not None and cached[0] == signature:
+                    self._pdf_cache.move_to_end(path)
+                    documents[path] = cached[1]
+                else:
+                    pending.append((pdf_file, path, signature))
+            
+            # Extract the uncached PDFs off the loop; the cache is only touched on the loop
+            results = []
+            if pending:
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(
+                    None, self._extract_pdfs, pdf_service, [path for _, path, _ in pending]
+                )
+            
+            for (pdf_file, path, signature), result in zip(pending, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"Failed to load {pdf_file.name}: {result}")
+                    continue
+                
+                document = self._truncate_pdf_result(result)
+                documents[path] = document
+                self._pdf_cache[path] = (signature, document)
+                if len(self._pdf_cache) > PDF_CACHE_SIZE:
+                    self._pdf_cache.popitem(last=False)
+            
+            for pdf_file in pdf_files:
+                document = documents.get(str(pdf_file))
+                if document is None:
+                    continue
+                
+                pdf_contents.append(
+                    f"\n--- PDF: {document['filename']} ({document['page_count']} pages) ---\n"
+                    f"{document['text']}"
+                )
+                logger.debug(f"Loaded PDF: {document['filename']} ({document['text_length']} chars)")
             
             if pdf_contents:
                 return "\n".join(pdf_contents)
@@ -229,6 +336,33 @@ class DataAggregator:
             logger.warning(f"Failed to load PDF data from {pdf_folder}: {e}")
             return None
     
+    @staticmethod
+    def _extract_pdfs(pdf_service, paths: List[str]) -> List[Any]:
+        """Extract each PDF sequentially, returning the result or the raised exception per path"""
+        results = []
+        for path in paths:
+            try:
+                results.append(pdf_service.extract_text(path))
+            except Exception as e:
+                results.append(e)
+        return results
+    
+    @staticmethod
+    def _truncate_pdf_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep only what the context uses from an extract_text result, text cut to MAX_CHARS_PER_PDF"""
+        pdf_text = result['extracted_text']
+        
+        # Truncate if too long
+        if len(pdf_text) > MAX_CHARS_PER_PDF:
+            pdf_text = pdf_text[:MAX_CHARS_PER_PDF] + "\n... [truncated]"
+        
+        return {
+            'filename': result['filename'],
+            'page_count': result['page_count'],
+            'text_length': result['text_length'],
+            'text': pdf_text
+        }
+    
     def get_data_summary(self, company_name: str) -> Dict:
         """Get summary of available data"""
         scraped_data = self.data_store.load_latest_scraped_data(company_name)
@@ -236,28 +370,34 @@ class DataAggregator:
         if not scraped_data:
             return {"available": False, "message": "No data found"}
         
+        # Count successes and collect content types in a single pass over the items
+        scraped_content = scraped_data.get("scraped_content", [])
+        successful_scrapes = 0
+        content_types = set()
+        for item in scraped_content:
+            if item.get("success"):
+                successful_scrapes += 1
+            content_types.add(item.get("content_type", "unknown"))
+        
         return {
             "available": True,
             "official_website": scraped_data.get("official_website"),
-            "total_content_items": len(scraped_data.get("scraped_content", [])),
-            "successful_scrapes": sum(
-                1 for item in scraped_data.get("scraped_content", [])
-                if item.get("success")
-            ),
-            "content_types": list(set(
-                item.get("content_type", "unknown")
-                for item in scraped_data.get("scraped_content", [])
-            ))
+            "total_content_items": len(scraped_content),
+            "successful_scrapes": successful_scrapes,
+            "content_types": list(content_types)
         }
 
 
 # Singleton instance
 _data_aggregator = None
+_data_aggregator_lock = threading.Lock()
 
 
 def get_data_aggregator() -> DataAggregator:
     """Get or create DataAggregator singleton"""
     global _data_aggregator
     if _data_aggregator is None:
-        _data_aggregator = DataAggregator()
+        with _data_aggregator_lock:
+            if _data_aggregator is None:
+                _data_aggregator = DataAggregator()
     return _data_aggregator
@@ -3,24 +3,39 @@
 Data storage service for scraped data
 File-based storage only
 """
-import json
+import mmap
+import os
+import re
+import threading
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
+# Filename suffix written by _save_to_file: _YYYYMMDD_HHMMSS.json (sorts chronologically)
+SCRAPE_FILENAME_SUFFIX_RE = re.compile(r'\d{8}_\d{6}\.json')
+
 
 class DataStore:
     """Data storage service for file-based storage"""
     
+    __slots__ = ('data_dir', '_latest_cache', '_companies_cache')
+    
     def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
         
         # Create subdirectory for scraped data
         (self.data_dir / "scraped").mkdir(exist_ok=True)
+        
+        # Latest scraped file per company filename prefix, keyed by the directory mtime
+        self._latest_cache: Dict[str, Tuple[int, Optional[Path]]] = {}
+        # Company listing of the scraped directory, keyed by the directory mtime
+        self._companies_cache: Optional[Tuple[int, List[Dict]]] = None
     
     def save_scraped_data(self, company_name: str, data: Dict, 
                           user_id: int = 1, save_to_file: bool = True) -> str:
@@ -44,8 +59,12 @@ class DataStore:
         filename = f"{company_name.lower().replace(' ', '_')}_{timestamp}.json"
         filepath = self.data_dir / "scraped" / filename
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # orjson returns UTF-8 bytes in one buffer, written without a text-mode layer
+        filepath.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        
+        # Drop cached directory lookups even if the filesystem's mtime did not move
+        self._latest_cache.clear()
+        self._companies_cache = None
         
         logger.info(f"Saved scraped data to: {filepath}")
         return str(filepath)
@@ -57,53 +76,99 @@ class DataStore:
         Returns:
             Dict with scraped data or None if not found
         """
-        pattern = f"{company_name.lower().replace(' ', '_')}_*.json"
-        files = list((self.data_dir / "scraped").glob(pattern))
+        latest_file = self.find_latest_scraped_file(company_name)
         
-        if not files:
+        if latest_file is None:
             logger.warning(f"No scraped data found for {company_name}")
             return None
         
-        # Get the most recent file
-        latest_file = max(files, key=lambda p: p.stat().st_mtime)
-        
-        with open(latest_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Parse straight from the mapped page cache instead of copying the file with read()
+        with open(latest_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # mmap cannot map an empty file; raise the usual JSON decode error instead
+                data = orjson.loads(b"")
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                    data = orjson.loads(view)
         
         logger.info(f"Loaded scraped data from: {latest_file}")
         return data
     
+    def find_latest_scraped_file(self, company_name: str) -> Optional[Path]:
+        """
+        Find the most recent scraped file for a company
+        
+        Filenames end in a zero-padded timestamp, so the newest scrape is the largest
+        matching name and no per-file stat() is needed. Saving a scrape adds a file and
+        so bumps the directory mtime; until then the previous lookup is reused.
+        """
+        scraped_dir = self.data_dir / "scraped"
+        prefix = f"{company_name.lower().replace(' ', '_')}_"
+        dir_mtime = scraped_dir.stat().st_mtime_ns
+        
+        cached = self._latest_cache.get(prefix)
+        if cached is not None and cached[0] == dir_mtime:
+            return cached[1]
+        
+        # The timestamp check also keeps "acme" from matching "acme_corp_..." files
+        with os.scandir(scraped_dir) as entries:
+            latest_name = max(
+                (entry.name for entry in entries
+                 if entry.name.startswith(prefix)
+                 and SCRAPE_FILENAME_SUFFIX_RE.fullmatch(entry.name, len(prefix))),
+                default=None
+            )
+        
+        latest_file = scraped_dir / latest_name if latest_name is not None else None
+        self._latest_cache[prefix] = (dir_mtime, latest_file)
+        return latest_file
+    
     def list_scraped_companies(self) -> List[Dict]:
         """
         List all scraped companies with metadata
         
+        The listing is rebuilt only when the scraped directory changes.
+        
         Returns:
             List of dicts with company info
         """
-        files = list((self.data_dir / "scraped").glob("*.json"))
+        scraped_dir = self.data_dir / "scraped"
+        dir_mtime = scraped_dir.stat().st_mtime_ns
         
+        if self._companies_cache is None or self._companies_cache[0] != dir_mtime:
+            self._companies_cache = (dir_mtime, self._scan_scraped_companies(scraped_dir))
+        
+        return [dict(company) for company in self._companies_cache[1]]
+    
+    @staticmethod
+    def _scan_scraped_companies(scraped_dir: Path) -> List[Dict]:
+        """Read company metadata for every scraped JSON file in one directory pass"""
         companies = []
-        for filepath in files:
-            # Parse filename: companyname_timestamp.json
-            filename = filepath.stem  # Remove .json
-            parts = filename.rsplit('_', 2)  # Split from right, max 2 splits
-            
-            if len(parts) >= 2:
-                company_name = ' '.join(parts[:-2]).replace('_', ' ').title()
-                timestamp = f"{parts[-2]}_{parts[-1]}"
-            else:
-                company_name = filename.replace('_', ' ').title()
-                timestamp = "unknown"
-            
-            stat = filepath.stat()
-            companies.append({
-                'company_name': company_name,
-                'filename': filepath.name,
-                'filepath': str(filepath),
-                'timestamp': timestamp,
-                'size_kb': round(stat.st_size / 1024, 2),
-                'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
-            })
+        with os.scandir(scraped_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json') or entry.name.startswith('.'):
+                    continue
+                
+                # Parse filename: companyname_timestamp.json
+                filename = entry.name[:-len('.json')]
+                parts = filename.rsplit('_', 2)  # Split from right, max 2 splits
+                
+                if len(parts) >= 2:
+                    company_name = ' '.join(parts[:-2]).replace('_', ' ').title()
+                    timestamp = f"{parts[-2]}_{parts[-1]}"
+                else:
+                    company_name = filename.replace('_', ' ').title()
+                    timestamp = "unknown"
+                
+                stat = entry.stat()
+                companies.append({
+                    'company_name': company_name,
+                    'filename': entry.name,
+                    'filepath': entry.path,
+                    'timestamp': timestamp,
+                    'size_kb': round(stat.st_size / 1024, 2),
+                    'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
+                })
         
         # Sort by modification time, newest first
         companies.sort(key=lambda x: x['modified'], reverse=True)
@@ -113,6 +178,7 @@ class DataStore:
 
 # Singleton instance
 _data_store = None
+_data_store_lock = threading.Lock()
 
 
 def get_data_store(db: Optional = None) -> DataStore:
@@ -127,8 +193,10 @@ def get_data_store(db: Optional = None) -> DataStore:
     """
     global _data_store
     
-    # Use singleton (file storage only)
+    # Use singleton (file storage only); the lock is only taken until it exists
     if _data_store is None:
-        _data_store = DataStore()
+        with _data_store_lock:
+            if _data_store is None:
+                _data_store = DataStore()
     return _data_store
 
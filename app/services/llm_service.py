@@ -6,7 +6,7 @@ Provides a clean interface for making requests and processing responses.
 """
 
 import asyncio
-from typing import Optional, Dict, Any, List, Literal
+from typing import Optional, Dict, Any, List, Literal, Union
 from openai import OpenAI
 import aiohttp
 import logging
@@ -157,14 +157,15 @@ class LLMService:
     
     def _prepare_messages(
         self,
-        prompt: str,
+        prompt: Union[str, List[str]],
         system_message: Optional[str] = None
     ) -> List[Dict[str, str]]:
         """
         Prepare message array for the API request.
         
         Args:
-            prompt: The user's prompt text
+            prompt: The user's prompt text, or a list of prompt segments sent as
+                consecutive user messages (avoids joining large documents into one string)
             system_message: Optional system message to set context
             
         Returns:
@@ -178,10 +179,12 @@ class LLMService:
                 "content": system_message
             })
         
-        messages.append({
-            "role": "user",
-            "content": prompt
-        })
+        segments = [prompt] if isinstance(prompt, str) else prompt
+        for segment in segments:
+            messages.append({
+                "role": "user",
+                "content": segment
+            })
         
         return messages
     
@@ -189,7 +192,8 @@ class LLMService:
         self,
         messages: List[Dict[str, str]],
         temperature: Optional[float] = None,
-        max_completion_tokens: Optional[int] = None
+        max_completion_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Prepare the complete request parameters for the API call.
@@ -198,6 +202,7 @@ class LLMService:
             messages: List of messages to send
             temperature: Override default temperature if provided
             max_completion_tokens: Override default max_completion_tokens if provided
+            response_format: Override the default text response format if provided
             
         Returns:
             Dictionary of request parameters
@@ -207,7 +212,7 @@ class LLMService:
             "messages": messages,
             "temperature": temperature if temperature is not None else self.config.temperature,
             "max_completion_tokens": max_completion_tokens if max_completion_tokens is not None else self.config.max_completion_tokens,
-            "response_format": {"type": "text"}
+            "response_format": response_format if response_format is not None else {"type": "text"}
         }
         
         return params
@@ -266,10 +271,11 @@ class LLMService:
     
     def generate(
         self,
-        prompt: str,
+        prompt: Union[str, List[str]],
         system_message: Optional[str] = None,
         temperature: Optional[float] = None,
-        max_completion_tokens: Optional[int] = None
+        max_completion_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None
     ) -> LLMResponse:
         """
         Generate a completion from the language model (synchronous).
@@ -278,10 +284,11 @@ class LLMService:
         workflow: preparing the request, sending it, and processing the response.
         
         Args:
-            prompt: The text prompt to send to the model
+            prompt: The text prompt to send to the model, or a list of prompt segments
             system_message: Optional system message to set context/behavior
             temperature: Override default temperature for this request
             max_completion_tokens: Override default max_completion_tokens for this request
+            response_format: Response format for this request, e.g. {"type": "json_object"}
             
         Returns:
             LLMResponse object containing the generated text and metadata
@@ -298,7 +305,7 @@ class LLMService:
         messages = self._prepare_messages(prompt, system_message)
         
         # Step 2: Prepare request parameters
-        params = self._prepare_request_params(messages, temperature, max_completion_tokens)
+        params = self._prepare_request_params(messages, temperature, max_completion_tokens, response_format)
         
         # Step 3: Send request
         raw_response = self._send_request(params)
@@ -310,11 +317,12 @@ class LLMService:
     
     async def generate_async(
         self,
-        prompt: str,
+        prompt: Union[str, List[str]],
         system_message: Optional[str] = None,
         temperature: Optional[float] = None,
         max_completion_tokens: Optional[int] = None,
-        provider: Literal["openai", "perplexity"] = "openai"
+        provider: Literal["openai", "perplexity"] = "openai",
+        response_format: Optional[Dict[str, Any]] = None
     ) -> LLMResponse:
         """
         Generate a completion from the language model (asynchronous).
@@ -323,11 +331,13 @@ class LLMService:
         Supports both OpenAI and Perplexity providers.
         
         Args:
-            prompt: The text prompt to send to the model
+            prompt: The text prompt to send to the model, or a list of prompt segments
+                sent as consecutive user messages
             system_message: Optional system message to set context/behavior
             temperature: Override default temperature for this request
             max_completion_tokens: Override default max_completion_tokens for this request
             provider: LLM provider to use ("openai" or "perplexity")
+            response_format: Response format for OpenAI requests, e.g. {"type": "json_object"}
             
         Returns:
             LLMResponse object containing the generated text and metadata
@@ -346,7 +356,7 @@ class LLMService:
             loop = asyncio.get_event_loop()
             return await loop.run_in_executor(
                 None,
-                lambda: self.generate(prompt, system_message, temperature, max_completion_tokens)
+                lambda: self.generate(prompt, system_message, temperature, max_completion_tokens, response_format)
             )
     
     def update_config(self, **kwargs):
@@ -377,7 +387,7 @@ class LLMService:
     
     async def _generate_perplexity_async(
         self,
-        prompt: str,
+        prompt: Union[str, List[str]],
         system_message: Optional[str] = None,
         temperature: Optional[float] = None,
         max_completion_tokens: Optional[int] = None
@@ -404,11 +414,12 @@ class LLMService:
                 "Set PERPLEXITY_API_KEY in .env file or environment variable."
             )
         
+        # Perplexity requires alternating user/assistant turns, so send segments as one message
+        if not isinstance(prompt, str):
+            prompt = "\n\n".join(prompt)
+        
         # Prepare messages
-        messages = []
-        if system_message:
-            messages.append({"role": "system", "content": system_message})
-        messages.append({"role": "user", "content": prompt})
+        messages = self._prepare_messages(prompt, system_message)
         
         # Prepare request parameters
         model = settings.PERPLEXITY_MODEL
@@ -0,0 +1,324 @@
+"""
+Tests for ContentProcessor cleaning helpers and batch LLM processing
+"""
+import asyncio
+import time
+
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.config import settings
+from app.services import content_processor
+from app.services.content_processor import ContentProcessor, TokenBucket
+
+
+def _make_response(content: str, prompt_tokens: int = 100, completion_tokens: int = 50) -> Mock:
+    response = Mock()
+    response.content = content
+    response.prompt_tokens = prompt_tokens
+    response.completion_tokens = completion_tokens
+    response.total_tokens = prompt_tokens + completion_tokens
+    return response
+
+
+def _make_batch(count: int, size: int = 100) -> list:
+    return [
+        {
+            'item': {'url': f"https://example.com/page{i}"},
+            'content': f"Page {i} content " + "x" * size,
+            'type': 'news'
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def processor():
+    # Fresh, generous rate limits so tests never wait on the shared module-level bucket
+    bucket = TokenBucket(rpm=1_000_000, tpm=1_000_000_000)
+    with patch("app.services.content_processor.get_llm_service") as mock_get, \
+         patch.object(content_processor, "_token_bucket", bucket):
+        mock_get.return_value = Mock()
+        yield ContentProcessor()
+
+
+def test_clean_markdown_removes_images_and_blank_lines(processor):
+    markdown = "# Title ![logo](https://example.com/logo.png)\n\n   Body text   \n\n[Docs]()\nFooter"
+    assert processor.clean_markdown(markdown) == "# Title\nBody text\nFooter"
+
+
+def test_clean_markdown_strips_lines_and_drops_blank_lines(processor):
+    markdown = "  First line \t\r\n \n\t Second  line\n\n   \nThird"
+    assert processor.clean_markdown(markdown) == "First line\nSecond  line\nThird"
+
+
+def test_clean_markdown_line_rules_stay_on_their_line(processor):
+    markdown = "Intro\nLoading... please wait\nReal content\n[Home] menu\nMore [x]() text"
+    assert processor.clean_markdown(markdown) == "Intro\nReal content\n[Home] menu\nMore  text"
+
+
+def test_clean_markdown_large_non_ascii_matches_str_path(processor):
+    block = ("Über uns — 客户案例 ![img](https://x.com/a.png) text\n"
+             "[Skip to main content](#main) nav\n"
+             "\n\n\n\nNext (see https://x.com/?a=1) ok [x]()\n")
+    markdown = block * 2000 + "You have been blocked trailing"
+    assert len(markdown) > content_processor.BYTES_CLEANUP_THRESHOLD
+
+    with patch.object(content_processor, "BYTES_CLEANUP_THRESHOLD", len(markdown)):
+        expected = processor._clean_markdown_uncached(markdown)
+
+    assert processor._clean_markdown_uncached(markdown) == expected
+
+
+def test_clean_markdown_caches_results(processor):
+    with patch.object(content_processor, "CLEAN_CACHE_SIZE", 2), \
+         patch.object(ContentProcessor, "_clean_markdown_uncached", side_effect=str.upper) as mock_clean:
+        assert processor.clean_markdown("a") == "A"
+        assert processor.clean_markdown("a") == "A"
+        assert mock_clean.call_count == 1
+
+        # Oldest entry is evicted once the cache is full
+        processor.clean_markdown("b")
+        processor.clean_markdown("c")
+        processor.clean_markdown("a")
+        assert mock_clean.call_count == 4
+
+
+def test_clean_markdown_empty(processor):
+    assert processor.clean_markdown("") == ""
+
+
+def test_extract_important_content_keeps_keyword_lines(processor):
+    content = "Our new CEO joined\n  nothing here  \nRecord REVENUE growth\nPlain text"
+    assert processor.extract_important_content(content) == "Our new CEO joined\nRecord REVENUE growth"
+
+
+def test_truncate_content_cuts_at_paragraph_boundary(processor):
+    content = "a" * 40 + "\n\n" + "b" * 40 + "\n\n" + "c" * 40
+    assert processor.truncate_content(content, max_chars=100) == "a" * 40 + "\n\n" + "b" * 40
+    assert processor.truncate_content(content, max_chars=200) == content
+
+
+def test_truncate_content_falls_back_to_line_break(processor):
+    content = "a" * 10 + "\n\n" + "b" * 50 + "\n" + "c" * 50
+    assert processor.truncate_content(content, max_chars=80) == "a" * 10 + "\n\n" + "b" * 50
+
+
+def test_split_llm_output_by_content_headers(processor):
+    llm_output = (
+        "Intro\n"
+        "**Content Item 1 (news) - Launch**: first analysis\n"
+        "**Content Item 2 (case_study) - Acme**:\nsecond analysis\n"
+    )
+    mapping = [{}, {}]
+    assert processor._split_llm_output_by_content(llm_output, mapping) == [
+        "first analysis", "second analysis"
+    ]
+
+
+def test_split_llm_output_by_content_template_headers(processor):
+    llm_output = (
+        "**CONTENT ITEM 1** (news)\nURL: https://example.com/a\nfirst analysis\n\n"
+        "**CONTENT ITEM 2** (case_study)\nsecond analysis"
+    )
+    mapping = [{}, {}]
+    assert processor._split_llm_output_by_content(llm_output, mapping) == [
+        "URL: https://example.com/a\nfirst analysis", "second analysis"
+    ]
+
+
+def test_split_llm_output_by_content_assigns_by_item_number(processor):
+    llm_output = "**CONTENT ITEM 2** (news)\nsecond analysis"
+    mapping = [{}, {}]
+    assert processor._split_llm_output_by_content(llm_output, mapping) == [llm_output, "second analysis"]
+
+
+@pytest.mark.asyncio
+async def test_batch_process_content_single_call_for_small_batch(processor):
+    processor.llm_service.generate_async = AsyncMock(return_value=_make_response("analysis"))
+
+    results = await processor.batch_process_content(_make_batch(3), "Acme")
+
+    assert processor.llm_service.generate_async.await_count == 1
+    assert [r['url'] for r in results] == [f"https://example.com/page{i}" for i in range(3)]
+    # Intro, one segment per content item, then instructions
+    prompt_segments = processor.llm_service.generate_async.await_args.kwargs['prompt']
+    assert len(prompt_segments) == 5
+    assert prompt_segments[1].startswith("--- Content 1 (news) ---")
+
+
+@pytest.mark.asyncio
+async def test_batch_process_content_parses_json_output(processor):
+    llm_output = (
+        '```json\n{"items": ['
+        '{"item": 2, "url": "https://example.com/page1", "categories": {"pain_points": ["Slow reports"]}},'
+        '{"item": 1, "url": "https://example.com/page0", "categories": {"customers_and_market": "Acme Corp"}}'
+        ']}\n```'
+    )
+    processor.llm_service.generate_async = AsyncMock(return_value=_make_response(llm_output))
+
+    results = await processor.batch_process_content(_make_batch(2), "Acme")
+
+    kwargs = processor.llm_service.generate_async.await_args.kwargs
+    assert kwargs['response_format'] == {"type": "json_object"}
+    assert results[0]['processed_content'].startswith("1. **CURRENT CUSTOMERS & TARGET MARKET**\nAcme Corp\n\n")
+    assert "4. **CUSTOMER PAIN POINTS & NEEDS**\n• Slow reports" in results[1]['processed_content']
+    assert "Not mentioned" in results[1]['processed_content']
+
+
+@pytest.mark.asyncio
+async def test_batch_process_content_splits_large_batch(processor):
+    processor.target_prompt_tokens = 100  # ~400 chars per sub-batch
+    processor.llm_service.generate_async = AsyncMock(return_value=_make_response("analysis"))
+
+    results = await processor.batch_process_content(_make_batch(4, size=300), "Acme")
+
+    assert processor.llm_service.generate_async.await_count == 4
+    assert [r['url'] for r in results] == [f"https://example.com/page{i}" for i in range(4)]
+    # Token usage is totalled across sub-batches
+    assert results[0]['content_processing_tokens']['total_tokens'] == 600
+
+
+@pytest.mark.asyncio
+async def test_batch_process_content_caps_items_per_call(processor):
+    processor.max_items_per_call = 2
+    processor.llm_service.generate_async = AsyncMock(return_value=_make_response("analysis"))
+
+    results = await processor.batch_process_content(_make_batch(5), "Acme")
+
+    assert processor.llm_service.generate_async.await_count == 3
+    assert len(results) == 5
+
+
+@pytest.mark.asyncio
+async def test_batch_process_content_sends_duplicate_content_once(processor):
+    processor.llm_service.generate_async = AsyncMock(return_value=_make_response("analysis"))
+    batch = _make_batch(2)
+    batch.append({'item': {'url': "https://example.com/mirror"}, 'content': batch[0]['content'], 'type': 'other'})
+
+    results = await processor.batch_process_content(batch, "Acme")
+
+    prompt_segments = processor.llm_service.generate_async.await_args.kwargs['prompt']
+    assert len(prompt_segments) == 4  # intro, 2 unique items, instructions
+    mirror = next(r for r in results if r['url'] == "https://example.com/mirror")
+    assert mirror['type'] == 'other'
+    assert mirror['processed_content'] == results[0]['processed_content']
+
+
+@pytest.mark.asyncio
+async def test_multi_company_batch_process_shares_one_call(processor):
+    processor.llm_service.generate_async = AsyncMock(return_value=_make_response("analysis"))
+    other = [{'item': {'url': "https://other.com/about"}, 'content': "Other company page", 'type': 'about'}]
+
+    results = await processor.multi_company_batch_process([("Acme", _make_batch(2)), ("Other", other)])
+
+    assert processor.llm_service.generate_async.await_count == 1
+    assert [[r['url'] for r in company] for company in results] == [
+        ["https://example.com/page0", "https://example.com/page1"],
+        ["https://other.com/about"],
+    ]
+    prompt_segments = processor.llm_service.generate_async.await_args.kwargs['prompt']
+    assert prompt_segments[3].startswith("--- Content 3 (about) ---\nCompany: Other\n")
+
+
+@pytest.mark.asyncio
+async def test_multi_company_batch_process_splits_when_over_budget(processor):
+    processor.target_prompt_tokens = 100
+    processor.llm_service.generate_async = AsyncMock(return_value=_make_response("analysis"))
+
+    results = await processor.multi_company_batch_process([
+        ("Acme", _make_batch(1, size=300)),
+        ("Other", _make_batch(1, size=300)),
+    ])
+
+    assert processor.llm_service.generate_async.await_count == 2
+    assert [len(company) for company in results] == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_batch_process_content_strips_shared_boilerplate(processor):
+    processor.llm_service.generate_async = AsyncMock(return_value=_make_response("analysis"))
+    batch = _make_batch(4)
+    for batch_item in batch[:3]:
+        batch_item['content'] += "\nContact us | Careers | Privacy"
+
+    await processor.batch_process_content(batch, "Acme")
+
+    prompt_segments = processor.llm_service.generate_async.await_args.kwargs['prompt']
+    assert not any("Contact us" in segment for segment in prompt_segments[1:5])
+    assert prompt_segments[1].endswith("Page 0 content " + "x" * 100)
+
+
+@pytest.mark.asyncio
+async def test_batch_process_content_falls_back_on_llm_error(processor):
+    processor.llm_service.generate_async = AsyncMock(side_effect=RuntimeError("boom"))
+
+    results = await processor.batch_process_content(_make_batch(2), "Acme")
+
+    assert len(results) == 2
+    assert results[0]['processed_content'].startswith("Page 0 content")
+
+
+@pytest.mark.asyncio
+async def test_batch_process_content_falls_back_only_for_failed_sub_batch(processor):
+    processor.target_prompt_tokens = 100  # one item per sub-batch
+
+    async def generate(prompt, **kwargs):
+        if "Page 1 content" in prompt[1]:
+            raise RuntimeError("boom")
+        return _make_response("analysis")
+
+    processor.llm_service.generate_async = AsyncMock(side_effect=generate)
+    batch = _make_batch(3, size=300)
+    batch.append({'item': {'url': "https://example.com/mirror"}, 'content': batch[1]['content'], 'type': 'other'})
+
+    results = await processor.batch_process_content(batch, "Acme")
+
+    assert processor.llm_service.generate_async.await_count == 3
+    by_url = {r['url']: r for r in results}
+    assert by_url["https://example.com/page0"]['processed_content'] == "analysis"
+    assert by_url["https://example.com/page2"]['processed_content'] == "analysis"
+    assert by_url["https://example.com/page1"]['processed_content'].startswith("Page 1 content")
+    assert by_url["https://example.com/mirror"]['processed_content'].startswith("Page 1 content")
+    assert by_url["https://example.com/mirror"]['type'] == 'other'
+    # Token usage only counts the sub-batches that returned
+    assert results[0]['content_processing_tokens']['total_tokens'] == 300
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_when_budget_exhausted():
+    bucket = TokenBucket(rpm=600, tpm=60000)  # refills 1000 tokens per second
+
+    start = time.monotonic()
+    await bucket.acquire(60000)
+    await bucket.acquire(100)
+
+    assert time.monotonic() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_iter_batch_process_content_yields_all_items(processor):
+    processor.target_prompt_tokens = 100
+    processor.llm_service.generate_async = AsyncMock(return_value=_make_response("analysis"))
+
+    results = [r async for r in processor.iter_batch_process_content(_make_batch(3, size=300), "Acme")]
+
+    assert sorted(r['url'] for r in results) == [f"https://example.com/page{i}" for i in range(3)]
+    assert results[0]['content_processing_tokens']['total_tokens'] == 150
+
+
+def test_batch_process_content_runs_on_separate_event_loops(processor):
+    async def slow_generate(**kwargs):
+        await asyncio.sleep(0.01)
+        return _make_response("analysis")
+
+    processor.max_items_per_call = 1
+    processor.llm_service.generate_async = AsyncMock(side_effect=slow_generate)
+    item_count = settings.LLM_MAX_CONCURRENCY * 2
+
+    # Each asyncio.run creates a new loop; the concurrency limit is contended on both
+    for _ in range(2):
+        results = asyncio.run(processor.batch_process_content(_make_batch(item_count), "Acme"))
+        assert len(results) == item_count
+
+    assert processor.llm_service.generate_async.await_count == item_count * 2
@@ -0,0 +1,234 @@
+"""
+Tests for CRMDataLoader CSV loading, normalization and statistics
+"""
+import logging
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+from app.services import crm_data_loader
+from app.services.crm_data_loader import CRMDataLoader
+
+FIXTURE_CSV = Path(__file__).parent / "fixtures" / "mock_crm_data.csv"
+
+
+def test_load_and_normalize_csv_reads_fixture(caplog):
+    caplog.set_level(logging.DEBUG, logger=crm_data_loader.__name__)
+    result = CRMDataLoader.load_and_normalize_csv(str(FIXTURE_CSV))
+
+    assert result['file_type'] == 'account'
+    assert result['crm_system'] == 'generic'
+    assert result['row_count'] == len(result['data'])
+    assert 'company_industry' in result['normalized_columns']
+
+
+def test_load_and_normalize_csv_caps_rows(tmp_path):
+    csv_path = tmp_path / "accounts.csv"
+    csv_path.write_text("company_name,industry\n" + "".join(f"Co {i},Tech\n" for i in range(20)))
+
+    with patch.object(crm_data_loader, "MAX_ROWS_PER_FILE", 5):
+        result = CRMDataLoader.load_and_normalize_csv(str(csv_path))
+
+    assert result['row_count'] == 5
+
+
+def test_load_and_normalize_csv_parses_only_mapped_columns(tmp_path, caplog):
+    caplog.set_level(logging.DEBUG, logger=crm_data_loader.__name__)
+    csv_path = tmp_path / "accounts.csv"
+    csv_path.write_text("company_name,internal_notes,industry\nAcme,call back,Tech\n")
+
+    result = CRMDataLoader.load_and_normalize_csv(str(csv_path))
+
+    assert result['original_columns'] == ['company_name', 'internal_notes', 'industry']
+    assert result['normalized_columns'] == ['company_name', 'company_industry']
+
+
+def test_load_and_normalize_csv_skips_column_lists_without_debug(caplog):
+    caplog.set_level(logging.INFO, logger=crm_data_loader.__name__)
+
+    result = CRMDataLoader.load_and_normalize_csv(str(FIXTURE_CSV))
+
+    assert result['original_columns'] is None
+    assert result['normalized_columns'] is None
+    assert 'company_industry' in result['data'].columns
+
+
+def test_load_and_normalize_csv_stores_low_cardinality_fields_as_category(tmp_path):
+    csv_path = tmp_path / "accounts.csv"
+    csv_path.write_text("company_name,industry\nAcme,Tech\nGlobex,Tech\n")
+
+    df = CRMDataLoader.load_and_normalize_csv(str(csv_path))['data']
+
+    assert isinstance(df['company_industry'].dtype, pd.CategoricalDtype)
+    assert df['company_name'].dtype == object
+
+
+def test_merge_crm_data_keeps_categoricals_from_several_files(tmp_path):
+    (tmp_path / "accounts_eu.csv").write_text("company_name,industry\nAcme,Tech\nGlobex,Tech\n")
+    (tmp_path / "accounts_us.csv").write_text("company_name,industry\nInitech,Finance\n")
+
+    merged = CRMDataLoader.merge_crm_data(CRMDataLoader.load_all_crm_files(str(tmp_path)))
+    industry = merged['accounts']['company_industry']
+
+    assert isinstance(industry.dtype, pd.CategoricalDtype)
+    assert set(industry.cat.categories) == {'Tech', 'Finance'}
+    assert sorted(industry.tolist()) == ['Finance', 'Tech', 'Tech']
+
+
+def test_load_and_normalize_csv_cp1252_file(tmp_path):
+    names = ["Crème Brûlée SARL", "José Peña", "Société Générale"]
+    csv_path = tmp_path / "accounts.csv"
+    csv_path.write_bytes(("company_name,industry\n" + "".join(f"{name},Food\n" for name in names)).encode("cp1252"))
+
+    result = CRMDataLoader.load_and_normalize_csv(str(csv_path))
+
+    assert result['data']['company_name'].tolist() == names
+
+
+def test_load_and_normalize_csv_short_cp1252_file(tmp_path):
+    csv_path = tmp_path / "accounts.csv"
+    csv_path.write_bytes("company_name,industry\nHélène Lefèvre,Retail\n".encode("cp1252"))
+
+    result = CRMDataLoader.load_and_normalize_csv(str(csv_path))
+
+    assert result['data']['company_name'].tolist() == ["Hélène Lefèvre"]
+
+
+def test_load_and_normalize_csv_utf8_char_across_sample_boundary(tmp_path):
+    header = "company_name,industry\n"
+    filler_row = "Acme Corp,Tech\n"
+    rows = header + filler_row * ((crm_data_loader.ENCODING_SAMPLE_BYTES - len(header)) // len(filler_row))
+    # Pad the last ASCII row so the two bytes of "é" straddle the end of the sample
+    padding = crm_data_loader.ENCODING_SAMPLE_BYTES - 1 - len(rows) - len("Caf")
+    content = (rows + "x" * padding + "Café,Food\n").encode("utf-8")
+    assert content[crm_data_loader.ENCODING_SAMPLE_BYTES - 1:crm_data_loader.ENCODING_SAMPLE_BYTES + 1] == "é".encode()
+    csv_path = tmp_path / "accounts.csv"
+    csv_path.write_bytes(content)
+
+    assert CRMDataLoader._detect_encoding(str(csv_path)) == 'utf-8'
+    result = CRMDataLoader.load_and_normalize_csv(str(csv_path))
+    assert result['data']['company_name'].iloc[-1] == "x" * padding + "Café"
+
+
+def test_detect_encoding(tmp_path):
+    utf16_path = tmp_path / "contacts.csv"
+    utf16_path.write_text("first_name,email\nJosé,jose@example.com\n", encoding="utf-16")
+    utf16_no_bom_path = tmp_path / "leads.csv"
+    utf16_no_bom_path.write_bytes("first_name,email\nJosé,jose@example.com\n".encode("utf-16-le"))
+    bom_path = tmp_path / "accounts.csv"
+    bom_path.write_bytes("company_name\nSociété\n".encode("utf-8-sig"))
+    ascii_path = tmp_path / "deals.csv"
+    ascii_path.write_text("deal_name,amount\nA,100\n")
+
+    assert CRMDataLoader._detect_encoding(str(utf16_path)) == 'utf-16'
+    assert CRMDataLoader._detect_encoding(str(utf16_no_bom_path)) == 'utf-16-le'
+    assert CRMDataLoader._detect_encoding(str(bom_path)) == 'utf-8-sig'
+    assert CRMDataLoader._detect_encoding(str(ascii_path)) == 'utf-8'
+
+
+def test_load_all_crm_files_groups_by_type(tmp_path):
+    (tmp_path / "accounts.csv").write_text("company_name,industry\nAcme,Tech\nGlobex,Finance\n")
+    (tmp_path / "contacts.csv").write_text("first_name,last_name,email\nAda,Lovelace,ada@example.com\n")
+    (tmp_path / "deals.csv").write_text("deal_name,stage,amount\nBig deal,Won,1000\n")
+
+    crm_files = CRMDataLoader.load_all_crm_files(str(tmp_path))
+
+    assert {file_type: len(files) for file_type, files in crm_files.items()} == {
+        'account': 1, 'contact': 1, 'opportunity': 1
+    }
+    assert crm_files['account'][0]['row_count'] == 2
+
+
+def test_map_columns_to_standard_prefers_crm_specific_names():
+    df = pd.DataFrame(columns=['Name', 'BillingCountry', 'Industry', 'employees', 'Notes'])
+
+    mapped = CRMDataLoader.map_columns_to_standard(df, 'account', 'salesforce')
+
+    assert mapped.columns.tolist() == [
+        'company_name', 'company_country', 'company_industry', 'company_size', 'Notes'
+    ]
+
+
+def test_map_columns_to_standard_unknown_type_keeps_columns():
+    df = pd.DataFrame(columns=['Name', 'Subject'])
+
+    assert CRMDataLoader.map_columns_to_standard(df, 'task', 'generic').columns.tolist() == ['Name', 'Subject']
+
+
+def test_merge_crm_data_concatenates_files_and_builds_statistics():
+    def loaded(data):
+        return {'data': pd.DataFrame(data)}
+
+    crm_files = {
+        'account': [
+            loaded({'company_name': ['Acme', 'Globex'], 'company_industry': ['Tech', 'Finance'],
+                    'company_size': [100, 300]}),
+            loaded({'company_name': ['Initech'], 'company_industry': ['Tech'], 'company_size': [200]}),
+        ],
+        'opportunity': [loaded({'deal_stage': ['Won', 'Lost', 'Won'], 'deal_amount': [1000.0, 500.0, None]})],
+    }
+
+    merged = CRMDataLoader.merge_crm_data(crm_files)
+    stats = merged['statistics']
+
+    assert len(merged['accounts']) == 3
+    assert stats['industry_distribution'] == {'Tech': 2, 'Finance': 1}
+    assert stats['company_size_stats'] == {'mean': 200.0, 'median': 200.0, 'min': 100.0, 'max': 300.0, 'count': 3}
+    assert stats['deal_amount_stats']['count'] == 2
+    assert (stats['total_accounts'], stats['total_contacts'], stats['total_opportunities']) == (3, 0, 3)
+    assert "Total Accounts: 3" in merged['text_summary']
+
+
+def test_top_counts_breaks_ties_by_first_appearance():
+    series = pd.Series(['Won', 'Lost', 'Open', 'Lost', None, 'Won', 'Open'])
+
+    assert CRMDataLoader._top_counts(series, 2) == {'Won': 2, 'Lost': 2}
+    assert CRMDataLoader._top_counts(series.astype('category'), 5) == {'Won': 2, 'Lost': 2, 'Open': 2}
+    assert CRMDataLoader._top_counts(pd.Series([], dtype=object), 5) == {}
+
+
+def test_identify_file_type_from_columns():
+    def frame(*columns):
+        return pd.DataFrame(columns=list(columns))
+
+    assert CRMDataLoader.identify_file_type("export.csv", frame('Id', 'BillingCity')) == 'account'
+    assert CRMDataLoader.identify_file_type("export.csv", frame('Id', 'Email')) == 'contact'
+    assert CRMDataLoader.identify_file_type("export.csv", frame('Id', 'StageName')) == 'opportunity'
+    assert CRMDataLoader.identify_file_type("export.csv", frame('Id', 'Notes')) is None
+    assert CRMDataLoader.identify_file_type("leads.csv", frame('Company')) == 'contact'
+
+
+def test_generate_text_summary_lists_top_entries():
+    stats = {
+        'total_accounts': 12,
+        'industry_distribution': {f"Industry {i}": 12 - i for i in range(12)},
+        'deal_stage_distribution': {'Won': 2, 'Lost': 1},
+    }
+
+    summary = CRMDataLoader._generate_text_summary({'statistics': stats})
+
+    assert "  Industry 9: 3" in summary
+    assert "Industry 10" not in summary
+    assert "--- Deal Stage Distribution ---\n  Won: 2\n  Lost: 1\n" in summary
+
+
+def test_load_all_crm_files_rescans_changed_directory(tmp_path):
+    (tmp_path / "accounts.csv").write_text("company_name,industry\nAcme,Tech\n")
+    assert list(CRMDataLoader.load_all_crm_files(str(tmp_path))) == ['account']
+
+    (tmp_path / "deals.csv").write_text("deal_name,stage,amount\nBig deal,Won,1000\n")
+    os.utime(tmp_path, ns=(0, tmp_path.stat().st_mtime_ns + 1))
+
+    assert sorted(CRMDataLoader.load_all_crm_files(str(tmp_path))) == ['account', 'opportunity']
+
+
+def test_detect_crm_system_checks_systems_in_priority_order():
+    def frame(*columns):
+        return pd.DataFrame(columns=list(columns))
+
+    assert CRMDataLoader.detect_crm_system(frame('hs_object_id', 'BillingCity')) == 'salesforce'
+    assert CRMDataLoader.detect_crm_system(frame('dealname', 'org_id')) == 'hubspot'
+    assert CRMDataLoader.detect_crm_system(frame('title', 'person_id')) == 'pipedrive'
+    assert CRMDataLoader.detect_crm_system(frame('company_name')) == 'generic'
@@ -0,0 +1,134 @@
+"""
+Tests for DataAggregator context preparation and data summaries
+"""
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.services import data_aggregator
+from app.services.data_aggregator import DataAggregator
+
+
+@pytest.fixture
+def aggregator():
+    with patch("app.services.data_aggregator.get_data_store") as mock_get:
+        mock_get.return_value = Mock()
+        mock_get.return_value.find_latest_scraped_file.return_value = None
+        yield DataAggregator()
+
+
+def test_get_data_summary_counts_items(aggregator):
+    aggregator.data_store.load_latest_scraped_data.return_value = {
+        "official_website": "https://acme.com",
+        "scraped_content": [
+            {"success": True, "content_type": "news"},
+            {"success": False, "content_type": "news"},
+            {"success": True},
+        ],
+    }
+
+    summary = aggregator.get_data_summary("Acme")
+
+    assert summary["total_content_items"] == 3
+    assert summary["successful_scrapes"] == 2
+    assert sorted(summary["content_types"]) == ["news", "unknown"]
+
+
+def test_get_data_summary_without_data(aggregator):
+    aggregator.data_store.load_latest_scraped_data.return_value = None
+
+    assert aggregator.get_data_summary("Acme") == {"available": False, "message": "No data found"}
+
+
+@pytest.mark.asyncio
+async def test_prepare_context_stops_at_char_budget(aggregator):
+    aggregator.data_store.load_latest_scraped_data.return_value = {
+        "scraped_content": [
+            {"success": True, "content_type": "news", "url": "https://acme.com/a", "markdown": "a" * 40},
+            {"success": False, "content_type": "news", "url": "https://acme.com/b", "markdown": "b" * 40},
+            {"success": True, "content_type": "blog", "url": "https://acme.com/c", "processed_markdown": "c" * 40},
+            {"success": True, "content_type": "about", "url": "https://acme.com/d", "markdown": "d" * 40},
+        ],
+    }
+
+    context, tokens = await aggregator.prepare_context(
+        "Acme", max_chars=180, include_crm=False, include_pdf=False
+    )
+
+    assert "--- NEWS ---\nURL: https://acme.com/a\n\n" + "a" * 40 in context
+    assert "c" * 40 in context
+    assert "b" * 40 not in context
+    assert "d" * 40 not in context
+    assert tokens == {}
+
+
+@pytest.mark.asyncio
+async def test_load_pdf_context_extracts_each_unchanged_pdf_once(aggregator, tmp_path):
+    (tmp_path / "deck.pdf").write_bytes(b"%PDF-1.4")
+    (tmp_path / "broken.pdf").write_bytes(b"%PDF-1.4")
+
+    def extract_text(path):
+        if path.endswith("broken.pdf"):
+            raise RuntimeError("cannot parse")
+        return {"filename": "deck.pdf", "page_count": 2, "text_length": 6000, "extracted_text": "p" * 6000}
+
+    with patch("app.services.pdf_service.PDFService") as mock_pdf_service:
+        mock_pdf_service.return_value.extract_text.side_effect = extract_text
+        first = await aggregator._load_pdf_context(str(tmp_path))
+        second = await aggregator._load_pdf_context(str(tmp_path))
+
+    assert first == second
+    assert first.startswith("\n--- PDF: deck.pdf (2 pages) ---\n" + "p" * 5000 + "\n... [truncated]")
+    # The successful extraction is cached; the failing PDF is retried
+    assert mock_pdf_service.return_value.extract_text.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_prepare_context_reuses_context_until_sources_change(aggregator, tmp_path):
+    scraped_file = tmp_path / "acme_20240101_000000.json"
+    scraped_file.write_text("{}")
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    aggregator.data_store.find_latest_scraped_file.return_value = scraped_file
+    aggregator.data_store.load_latest_scraped_data.return_value = {
+        "scraped_content": [{"success": True, "content_type": "news", "url": "https://acme.com", "markdown": "news"}],
+        "content_processing_tokens": {"total_tokens": 10},
+    }
+    options = dict(include_crm=False, include_pdf=True, pdf_folder=str(pdf_dir))
+
+    first = await aggregator.prepare_context("Acme", **options)
+    second = await aggregator.prepare_context("Acme", **options)
+    assert first == second
+    assert aggregator.data_store.load_latest_scraped_data.call_count == 1
+
+    # A new PDF in the folder invalidates the cached context
+    (pdf_dir / "deck.pdf").write_bytes(b"%PDF-1.4")
+    with patch("app.services.pdf_service.PDFService") as mock_pdf_service:
+        mock_pdf_service.return_value.extract_text.return_value = {
+            "filename": "deck.pdf", "page_count": 1, "text_length": 4, "extracted_text": "deck"
+        }
+        third, _ = await aggregator.prepare_context("Acme", **options)
+
+    assert aggregator.data_store.load_latest_scraped_data.call_count == 2
+    assert "--- PDF: deck.pdf (1 pages) ---" in third
+
+
+@pytest.mark.asyncio
+async def test_load_pdf_context_caches_truncated_text_with_size_cap(aggregator, tmp_path):
+    for name in ("a.pdf", "b.pdf"):
+        (tmp_path / name).write_bytes(b"%PDF-1.4")
+
+    def extract_text(path):
+        name = path.rsplit("/", 1)[-1]
+        return {"filename": name, "page_count": 1, "text_length": 9000, "extracted_text": "t" * 9000,
+                "metadata": {"title": name}}
+
+    with patch("app.services.pdf_service.PDFService") as mock_pdf_service, \
+         patch.object(data_aggregator, "PDF_CACHE_SIZE", 1):
+        mock_pdf_service.return_value.extract_text.side_effect = extract_text
+        await aggregator._load_pdf_context(str(tmp_path))
+
+    assert len(aggregator._pdf_cache) == 1
+    (_, document), = aggregator._pdf_cache.values()
+    assert set(document) == {"filename", "page_count", "text_length", "text"}
+    assert document["text"] == "t" * 5000 + "\n... [truncated]"
@@ -0,0 +1,73 @@
+"""
+Tests for DataStore file-based scraped data storage
+"""
+import json
+import os
+
+import pytest
+
+from app.services.data_store import DataStore
+
+
+def _write_scrape(store, filename, data, mtime):
+    path = store.data_dir / "scraped" / filename
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_load_latest_scraped_data_picks_newest_file(tmp_path):
+    store = DataStore(str(tmp_path))
+    _write_scrape(store, "acme_corp_20240101_000000.json", {"version": 1}, 3_000)
+    _write_scrape(store, "acme_corp_20240102_000000.json", {"version": 2}, 1_000)
+    _write_scrape(store, "acme_20240103_000000.json", {"version": 3}, 2_000)
+
+    # Newest by filename timestamp, regardless of file mtimes
+    assert store.load_latest_scraped_data("Acme Corp") == {"version": 2}
+    # "acme" does not pick up "acme_corp_..." files
+    assert store.load_latest_scraped_data("Acme") == {"version": 3}
+    assert store.load_latest_scraped_data("Initech") is None
+
+
+def test_load_latest_scraped_data_sees_new_saves(tmp_path):
+    store = DataStore(str(tmp_path))
+    _write_scrape(store, "acme_20240101_000000.json", {"version": 1}, 1_000)
+    assert store.load_latest_scraped_data("Acme") == {"version": 1}
+
+    scraped_dir = store.data_dir / "scraped"
+    _write_scrape(store, "acme_20240102_000000.json", {"version": 2}, 2_000)
+    os.utime(scraped_dir, ns=(0, scraped_dir.stat().st_mtime_ns + 1))
+
+    assert store.load_latest_scraped_data("Acme") == {"version": 2}
+
+
+def test_load_latest_scraped_data_empty_file_raises_decode_error(tmp_path):
+    store = DataStore(str(tmp_path))
+    (store.data_dir / "scraped" / "acme_20240101_000000.json").touch()
+
+    with pytest.raises(json.JSONDecodeError):
+        store.load_latest_scraped_data("Acme")
+
+
+def test_save_scraped_data_round_trips(tmp_path):
+    store = DataStore(str(tmp_path))
+    data = {"official_website": "Société Générale", "scraped_content": [{"url": "https://example.com", "success": True}]}
+
+    filepath = store.save_scraped_data("Acme Corp", data)
+
+    assert os.path.basename(filepath).startswith("acme_corp_")
+    assert json.loads(open(filepath, encoding="utf-8").read()) == data
+    assert store.load_latest_scraped_data("Acme Corp") == data
+
+
+def test_list_scraped_companies_refreshes_after_save(tmp_path):
+    store = DataStore(str(tmp_path))
+    _write_scrape(store, "acme_corp_20240101_000000.json", {}, 1_000)
+    _write_scrape(store, ".partial.json", {}, 1_500)
+
+    companies = store.list_scraped_companies()
+    assert [(c['company_name'], c['timestamp']) for c in companies] == [("Acme Corp", "20240101_000000")]
+
+    store.save_scraped_data("Globex", {})
+
+    assert [c['company_name'] for c in store.list_scraped_companies()] == ["Globex", "Acme Corp"]